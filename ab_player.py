@@ -0,0 +1,139 @@
+# Sound Imports
+import pygame
+
+# Math Imports
+import numpy as np
+
+# OS imports
+import time
+
+
+class ABPlayer:
+    """
+    Plays the original and the processed audio at the same time on two mixer channels,
+    with only one of them audible.
+
+    Both signals are kept as aligned in-memory buffers and started back to back, so
+    switching only swaps the channel volumes. It takes effect with the next mixer buffer,
+    without reloading anything or seeking back to the start.
+    """
+
+    # The mixer buffer in frames, the switching delay is at most that long
+    buffer_size: int = 512
+
+    def __init__(self) \
+        -> None:
+        """
+        Initializes the player without any audio.
+        """
+
+        self.sound_channels: list = []
+        self.samplerate = 0
+        self.length = 0
+        self.active = 0
+        self.started = 0.0
+        return
+
+    @staticmethod
+    def to_mixer(audio: np.ndarray) \
+        -> np.ndarray:
+        """
+        Converts the audio data to the 16-bit format of the mixer.
+
+        Args:
+            audio (np.ndarray): Integer audio data, or float audio data in the [-1, 1] range.
+
+        Returns:
+            np.ndarray: The contiguous int16 audio data, clipped to full scale.
+        """
+
+        audio = np.asarray(audio)
+        if np.issubdtype(audio.dtype, np.integer):
+            audio = audio / np.iinfo(audio.dtype).max
+        return np.ascontiguousarray(np.clip(audio, -1, 1) * 32767, dtype=np.int16)
+
+    def play(self, samplerate: int, original: np.ndarray, processed: np.ndarray, active: int = 0) \
+        -> None:
+        """
+        Starts playing both signals from the beginning.
+
+        The mixer is reinitialized if its samplerate or number of channels differ from the audio.
+
+        Args:
+            samplerate (int): The samplerate shared by both signals.
+            original (np.ndarray): The original audio data, signal A.
+            processed (np.ndarray): The processed audio data of the same shape, signal B.
+            active (int): The signal that is audible first, 0 for A and 1 for B.
+
+        Returns:
+            None
+        """
+
+        self.stop()
+        channels = 1 if original.ndim == 1 else original.shape[1]
+        if pygame.mixer.get_init() != (samplerate, -16, channels):
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=samplerate, size=-16, channels=channels, buffer=self.buffer_size)
+        pygame.mixer.set_reserved(2)
+
+        self.length = min(len(original), len(processed))
+        sounds = [pygame.sndarray.make_sound(ABPlayer.to_mixer(audio[:self.length])) for audio in [original, processed]]
+        self.sound_channels = [pygame.mixer.Channel(0), pygame.mixer.Channel(1)]
+        self.samplerate = samplerate
+        self.active = active
+        self.__apply_volumes()
+
+        for sound_channel, sound in zip(self.sound_channels, sounds):
+            sound_channel.play(sound)
+        self.started = time.perf_counter()
+        return
+
+    def switch(self) \
+        -> int:
+        """
+        Makes the other signal audible at the current position.
+
+        Returns:
+            int: The signal that is audible now, 0 for A and 1 for B.
+        """
+
+        self.active = 1 - self.active
+        self.__apply_volumes()
+        return self.active
+
+    def stop(self) \
+        -> None:
+        """
+        Stops both signals.
+        """
+
+        for sound_channel in self.sound_channels:
+            sound_channel.stop()
+        self.sound_channels = []
+        return
+
+    def get_busy(self) \
+        -> bool:
+        """
+        Returns whether the signals are still playing.
+        """
+
+        return any(sound_channel.get_busy() for sound_channel in self.sound_channels)
+
+    def position(self) \
+        -> int:
+        """
+        Returns the number of frames played since the start.
+        """
+
+        return min(int((time.perf_counter() - self.started) * self.samplerate), self.length)
+
+    def __apply_volumes(self) \
+        -> None:
+        """
+        Mutes all channels but the active one.
+        """
+
+        for i, sound_channel in enumerate(self.sound_channels):
+            sound_channel.set_volume(1.0 if i == self.active else 0.0)
+        return
@@ -1,38 +1,50 @@
 import os
 import csv
+import argparse
 import numpy as np
 import librosa
 from sound_tools.sound_comparison import SoundComparison
 
 
-if __name__ == "__main__":
-    noised_files = os.listdir("data/clean_10")
-    results = []
+def get_spectral_properties(filepath, approximate, error_bound):
+    """
+    Returns the mean spectral centroid and flatness of the file, followed by the half-widths
+    of their confidence intervals and the number of frames read when they are approximate.
+    """
 
-    for file in noised_files:
-        file_path = os.path.join("data/clean_10", file)
-        y_1, _ = librosa.load(file_path)
-        centroid_1, mean_1 = SoundComparison.get_spectral_properties(y_1)
-        centroid_1, mean_1 = np.mean(centroid_1), np.mean(mean_1)
+    if approximate:
+        (centroid, centroid_ci), (mean, mean_ci), frames = \
+            SoundComparison.estimate_spectral_properties(filepath, error_bound)
+        return [centroid, mean, centroid_ci, mean_ci, frames]
 
-        wiener_denoised = os.path.join("data/wiener_denoised", file)
-        y_2, _ = librosa.load(wiener_denoised)
-        centroid_2, mean_2 = SoundComparison.get_spectral_properties(y_2)
-        centroid_2, mean_2 = np.mean(centroid_2), np.mean(mean_2)
+    y, _ = librosa.load(filepath)
+    centroid, mean = SoundComparison.get_spectral_properties(y)
+    return [np.mean(centroid), np.mean(mean)]
 
-        lib_wiener_denoised = os.path.join("data/lib_wiener_denoised", file)
-        y_3, _ = librosa.load(lib_wiener_denoised)
-        centroid_3, mean_3 = SoundComparison.get_spectral_properties(y_3)
-        centroid_3, mean_3 = np.mean(centroid_3), np.mean(mean_3)
 
-        lib_wiener_denoised = os.path.join("data/noised_10", file)
-        y_4, _ = librosa.load(lib_wiener_denoised)
-        centroid_4, mean_4 = SoundComparison.get_spectral_properties(y_4)
-        centroid_4, mean_4 = np.mean(centroid_4), np.mean(mean_4)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Computes the spectral properties of the dataset files.")
+    parser.add_argument("--approximate", action="store_true",
+                        help="Estimate the properties from sampled frames, with their confidence intervals.")
+    parser.add_argument("--error-bound", type=float, default=0.01)
+    args = parser.parse_args()
+
+    datasets = [("data/clean_10", "Clear"), ("data/wiener_denoised", "Wiener"),
+                ("data/lib_wiener_denoised", "Lib Wiener"), ("data/noised_10", "Noised")]
+    columns = ["Centroid", "Mean"]
+    if args.approximate:
+        columns += ["Centroid CI", "Mean CI", "Frames"]
 
-        results.append([file, centroid_1, mean_1, centroid_2, mean_2, centroid_3, mean_3, centroid_4, mean_4])
+    noised_files = os.listdir("data/clean_10")
+    results = []
+
+    for file in noised_files:
+        row = [file]
+        for directory, _ in datasets:
+            row += get_spectral_properties(os.path.join(directory, file), args.approximate, args.error_bound)
+        results.append(row)
 
     with open("absolute_results.csv", "w", newline="") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(["File", "Clear Centroid", "Clear Mean", "Wiener Centroid", "Wiener Mean", "Lib Wiener Centroid", "Lib Wiener Mean", "Noised Centroid", "Noised Mean"])
+        writer.writerow(["File"] + [f"{name} {column}" for _, name in datasets for column in columns])
         writer.writerows(results)
@@ -0,0 +1,41 @@
+import os
+import argparse
+from sound_tools.sound_io import SoundIO
+from sound_tools.sound_cache import SoundCache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enhanses all audio files in a directory block by block.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--method", default="wiener", choices=["wiener", "lib_wiener"])
+    parser.add_argument("--format", default="flac", choices=["wav", "flac", "ogg"])
+    parser.add_argument("--block-size", type=int, default=65536)
+    parser.add_argument("--psd-tolerance", type=float, default=None,
+                        help="stop the wiener noise estimate once it changes less than that, e.g. 0.001")
+    parser.add_argument("--cache-dir", default=None,
+                        help="share the processed output cache with the GUI and the service, "
+                             "the files are then read into memory as a whole")
+    parser.add_argument("--cache-size-mb", type=int, default=512)
+    args = parser.parse_args()
+    cache = SoundCache(args.cache_dir, args.cache_size_mb * 1024 ** 2) if args.cache_dir else None
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for file in sorted(os.listdir(args.input_dir)):
+        base_name, ext = os.path.splitext(file)
+        if ext.lower() not in [".wav", ".flac", ".ogg"]:
+            continue
+
+        output_path = os.path.join(args.output_dir, base_name + "." + args.format)
+        params = {"psd_tolerance": args.psd_tolerance} if args.psd_tolerance is not None else {}
+        input_path = os.path.join(args.input_dir, file)
+        if cache is None:
+            clipped = SoundIO.enhance_file(args.method, input_path, output_path, args.block_size, **params)
+            cache_hit = False
+        else:
+            # The cache key needs the whole input, so cached files are not streamed
+            samplerate, data = SoundIO.read(input_path, args.block_size)
+            processed, _, cache_hit = cache.process(samplerate, data, args.method, params)
+            clipped = SoundIO.write(output_path, samplerate, processed)
+        print(file, "->", output_path, "(cached)" if cache_hit else "",
+              f"(clipped: {clipped} samples)" if clipped else "")
@@ -0,0 +1,636 @@
+# Server Imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request, error, parse
+import threading
+import queue
+import json
+
+# Math Imports
+from scipy.io import wavfile
+import numpy as np
+import soundfile as sf
+
+# OS imports
+import argparse
+import tempfile
+import shutil
+import time
+import uuid
+import io
+import os
+
+# Practical Imports
+from collections import deque
+from sound_tools.sound_enhansement import SoundEnhansement
+from sound_tools.sound_comparison import SoundComparison
+from sound_tools.sound_cache import SoundCache
+from sound_tools.memory_budget import MemoryBudget
+from sound_tools.sound_io import SoundIO
+from helpers import delete_temp_file
+
+
+class EnhansementService:
+    """
+    Local job-queue service that runs SoundEnhansement methods on a bounded worker pool.
+
+    Jobs are submitted over HTTP either as WAV bytes or as references to local WAV, FLAC
+    or OGG files. The output format of a file reference is given by its extension.
+    When the queue is full, new jobs are rejected with 503 so the clients can back off.
+
+    Endpoints:
+        POST /jobs?method=<name>: Submits WAV bytes from the request body.
+        POST /jobs: Submits a JSON {"method", "input", "output"} with local file paths.
+        GET /jobs/<id>: Returns the job status and the SoundComparison metrics.
+        GET /jobs/<id>/result: Returns the processed audio file.
+        DELETE /jobs/<id>: Forgets the job and deletes its files.
+        GET /stats: Returns the queue depth and latency statistics.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 workers: int = 2, queue_size: int = 16, history: int = 1000,
+                 cache: SoundCache | None = None, memory_budget: int | None = None,
+                 retention: int = 1000, job_ttl: float | None = 3600.0, measure_memory: bool = False) \
+        -> None:
+        """
+        Initializes the service.
+
+        Args:
+            host (str): The host to bind to.
+            port (int): The port to bind to, 0 picks a free one.
+            workers (int): The number of worker threads.
+            queue_size (int): The maximum number of queued jobs before rejecting new ones.
+            history (int): The number of finished jobs kept for latency statistics.
+            cache (SoundCache, optional): The cache of processed audio shared with other tools.
+            memory_budget (int, optional): The memory budget of a single job in bytes. Jobs that
+                do not fit are processed in chunks, or fail before their input is decoded if even
+                that does not fit. Their metrics are sampled with compare_audio_approximate when
+                the exact ones do not fit.
+            retention (int): The number of finished jobs kept until the oldest ones are forgotten.
+            job_ttl (float, optional): The seconds a finished job is kept. Defaults to an hour,
+                None keeps the jobs until they are deleted or exceed the retention.
+            measure_memory (bool): Whether to measure the peak memory of the filtering with
+                tracemalloc. It slows the jobs down and runs their filtering one at a time.
+
+        Returns:
+            None
+        """
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cache = cache
+        self.memory_budget = memory_budget
+        self.retention = retention
+        self.job_ttl = job_ttl
+        self.measure_memory = measure_memory
+        self.jobs: dict = {}
+        self.jobs_lock = threading.Lock()
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.temp_dir = tempfile.mkdtemp(prefix="enhansement_service_")
+
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "cache_hits": 0}
+        self.latencies = {"queue_wait": deque(maxlen=history),
+                          "processing": deque(maxlen=history),
+                          "total": deque(maxlen=history)}
+
+        self.server = ThreadingHTTPServer((host, port), self.__make_handler())
+        self.server.daemon_threads = True
+        self.threads = [threading.Thread(target=self.__worker, daemon=True) for _ in range(workers)]
+        return
+
+    @property
+    def url(self) \
+        -> str:
+        """
+        The base URL of the running service.
+        """
+
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) \
+        -> None:
+        """
+        Starts the workers and serves the requests in a background thread.
+        """
+
+        self.__start_workers()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return
+
+    def serve_forever(self) \
+        -> None:
+        """
+        Starts the workers and serves the requests in the current thread.
+        """
+
+        self.__start_workers()
+        self.server.serve_forever()
+        return
+
+    def stop(self) \
+        -> None:
+        """
+        Stops the server, the workers and deletes all job files.
+        """
+
+        self.server.shutdown()
+        self.server.server_close()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        return
+
+    def submit(self, method: str, input_path: str, output_path: str | None = None,
+               owns_input: bool = False) \
+        -> str:
+        """
+        Queues a new job.
+
+        Args:
+            method (str): The SoundEnhansement method name.
+            input_path (str): The path to the audio file to process.
+            output_path (str, optional): Where to write the result. Defaults to a file
+                in the service temporary directory.
+            owns_input (bool): Whether the input file belongs to the service and
+                should be deleted with the job.
+
+        Raises:
+            ValueError: If the method is unknown.
+            queue.Full: If the queue is full.
+
+        Returns:
+            str: The job id.
+        """
+
+        SoundEnhansement.get_method(method)
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "method": method,
+            "status": "queued",
+            "input": input_path,
+            "output": output_path or os.path.join(self.temp_dir, job_id + "_out.wav"),
+            "owns_input": owns_input,
+            "owns_output": output_path is None,
+            "submitted": time.perf_counter(),
+            "finished": None,
+            "metrics": None,
+            "error": None,
+            "peak_memory": None,
+            "chunk_size": None,
+        }
+
+        with self.jobs_lock:
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                self.counters["rejected"] += 1
+                raise
+            self.jobs[job_id] = job
+            self.counters["submitted"] += 1
+        self.__expire_jobs()
+        return job_id
+
+    def get_job(self, job_id: str) \
+        -> dict | None:
+        """
+        Returns a public copy of the job description.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            dict | None: The job description, or None if there is no such job.
+        """
+
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: job[key] for key in ["id", "method", "status", "metrics", "error", "output",
+                                              "peak_memory", "chunk_size"]} | \
+                {"latency": job.get("latency")}
+
+    def delete_job(self, job_id: str) \
+        -> bool:
+        """
+        Forgets the finished job and deletes the files that belong to the service.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            bool: False if there is no such finished job.
+        """
+
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] not in ["done", "failed"]:
+                return False
+            del self.jobs[job_id]
+
+        self.__delete_files(job)
+        return True
+
+    def get_stats(self) \
+        -> dict:
+        """
+        Returns the queue depth, job counters and latency statistics in seconds.
+        """
+
+        def summarize(values):
+            if not values:
+                return {"count": 0}
+            values = np.array(values)
+            return {"count": len(values), "mean": float(np.mean(values)),
+                    "p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+                    "max": float(np.max(values))}
+
+        with self.jobs_lock:
+            running = sum(job["status"] == "running" for job in self.jobs.values())
+            return {
+                "queue_depth": self.queue.qsize(),
+                "queue_size": self.queue_size,
+                "workers": self.workers,
+                "running": running,
+                **self.counters,
+                "latency": {name: summarize(list(values)) for name, values in self.latencies.items()},
+            }
+
+    def __expire_jobs(self) \
+        -> None:
+        """
+        Forgets the finished jobs older than job_ttl and the oldest ones above the retention,
+        deleting the files that belong to the service.
+        """
+
+        now = time.perf_counter()
+        with self.jobs_lock:
+            finished = sorted((job for job in self.jobs.values() if job["finished"] is not None),
+                              key=lambda job: job["finished"])
+            expired = finished[:max(len(finished) - self.retention, 0)]
+            if self.job_ttl is not None:
+                expired += [job for job in finished[len(expired):] if now - job["finished"] > self.job_ttl]
+            for job in expired:
+                del self.jobs[job["id"]]
+
+        for job in expired:
+            self.__delete_files(job)
+        return
+
+    @staticmethod
+    def __delete_files(job: dict) \
+        -> None:
+        """
+        Deletes the input and output files of the job that belong to the service.
+        """
+
+        if job["owns_input"]:
+            delete_temp_file(job["input"])
+        if job["owns_output"]:
+            delete_temp_file(job["output"])
+        return
+
+    def __start_workers(self) \
+        -> None:
+        """
+        Starts the worker threads.
+        """
+
+        for thread in self.threads:
+            thread.start()
+        return
+
+    def __worker(self) \
+        -> None:
+        """
+        Takes the jobs from the queue and processes them until None is received.
+        """
+
+        while True:
+            job_id = self.queue.get()
+            if job_id is None:
+                return
+
+            with self.jobs_lock:
+                job = self.jobs[job_id]
+                job["status"] = "running"
+            started = time.perf_counter()
+
+            try:
+                # Reject the job before decoding its input if it cannot fit into the budget.
+                # The exact metrics load both files whole, so they are sampled if that does not fit
+                approximate = False
+                if self.memory_budget is not None:
+                    samplerate, frames, channels = SoundIO.info(job["input"])
+                    shape = (frames,) if channels == 1 else (frames, channels)
+                    MemoryBudget.plan(job["method"], shape, SoundIO.read_dtype(job["input"]), self.memory_budget)
+                    approximate = MemoryBudget.estimate_metrics(shape, samplerate) > self.memory_budget
+
+                samplerate, audio = SoundIO.read(job["input"])
+                usage = {}
+
+                def process(samplerate, audio):
+                    processed, usage["chunk_size"], usage["peak_memory"] = \
+                        MemoryBudget.run(job["method"], samplerate, audio, self.memory_budget,
+                                         self.measure_memory)
+                    return processed
+
+                def get_metrics(processed):
+                    SoundIO.write(job["output"], samplerate, processed)
+                    compare = SoundComparison.compare_audio_approximate if approximate \
+                        else SoundComparison.compare_audio
+                    centroid_diff, mean_diff = compare(job["input"], job["output"])
+                    return {"centroid_diff": float(centroid_diff), "mean_diff": float(mean_diff),
+                            "approximate": approximate}
+
+                if self.cache is None:
+                    metrics, cache_hit = get_metrics(process(samplerate, audio)), False
+                else:
+                    processed, metrics, cache_hit = self.cache.process(samplerate, audio, job["method"],
+                                                                       get_metrics=get_metrics, function=process)
+                    if cache_hit:
+                        SoundIO.write(job["output"], samplerate, processed)
+                status, message = "done", None
+            except Exception as e:
+                metrics, status, message, usage = None, "failed", str(e), {}
+
+            finished = time.perf_counter()
+            with self.jobs_lock:
+                job["metrics"], job["status"], job["error"] = metrics, status, message
+                job["finished"] = finished
+                job.update(usage)
+                job["latency"] = {"queue_wait": started - job["submitted"],
+                                  "processing": finished - started,
+                                  "total": finished - job["submitted"]}
+                for name, value in job["latency"].items():
+                    self.latencies[name].append(value)
+                self.counters["completed" if status == "done" else "failed"] += 1
+                if status == "done" and cache_hit:
+                    self.counters["cache_hits"] += 1
+            self.__expire_jobs()
+
+    def __make_handler(self) \
+        -> type:
+        """
+        Creates the HTTP request handler bound to this service.
+        """
+
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                return
+
+            def send_json(self, code: int, body: dict, headers: dict | None = None):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                url = parse.urlparse(self.path)
+                if url.path != "/jobs":
+                    return self.send_json(404, {"error": "Not found"})
+
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                owns_input = False
+                try:
+                    if self.headers.get("Content-Type", "") == "application/json":
+                        description = json.loads(body)
+                        method = description["method"]
+                        input_path, output_path = description["input"], description.get("output")
+                    else:
+                        method = parse.parse_qs(url.query).get("method", ["wiener"])[0]
+                        SoundEnhansement.get_method(method)
+                        input_path = os.path.join(service.temp_dir, uuid.uuid4().hex + "_in.wav")
+                        output_path, owns_input = None, True
+                        with open(input_path, "wb") as file:
+                            file.write(body)
+                    job_id = service.submit(method, input_path, output_path, owns_input)
+                except queue.Full:
+                    if owns_input:
+                        delete_temp_file(input_path)
+                    return self.send_json(503, {"error": "Queue is full"}, {"Retry-After": "1"})
+                except (KeyError, ValueError) as e:
+                    return self.send_json(400, {"error": str(e)})
+
+                self.send_json(202, {"id": job_id})
+
+            def do_GET(self):
+                parts = parse.urlparse(self.path).path.strip("/").split("/")
+                if parts == ["stats"]:
+                    return self.send_json(200, service.get_stats())
+                if len(parts) < 2 or parts[0] != "jobs":
+                    return self.send_json(404, {"error": "Not found"})
+
+                job = service.get_job(parts[1])
+                if job is None:
+                    return self.send_json(404, {"error": "Unknown job"})
+                if len(parts) == 2:
+                    return self.send_json(200, job)
+                if job["status"] != "done":
+                    return self.send_json(409, {"error": f"Job is {job['status']}"})
+
+                # The job may expire or be deleted after get_job released the lock
+                try:
+                    with open(job["output"], "rb") as file:
+                        data = file.read()
+                except FileNotFoundError:
+                    return self.send_json(404, {"error": "Unknown job"})
+                self.send_response(200)
+                extension = os.path.splitext(job["output"])[1].lower().lstrip(".") or "wav"
+                self.send_header("Content-Type", f"audio/{extension}")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_DELETE(self):
+                parts = parse.urlparse(self.path).path.strip("/").split("/")
+                if len(parts) == 2 and parts[0] == "jobs" and service.delete_job(parts[1]):
+                    return self.send_json(200, {"id": parts[1]})
+                self.send_json(404, {"error": "Unknown or unfinished job"})
+
+        return Handler
+
+
+class EnhansementClient:
+    """
+    Client for the local EnhansementService.
+    """
+
+    def __init__(self, url: str = "http://127.0.0.1:8765", retries: int = 10) \
+        -> None:
+        """
+        Initializes the client.
+
+        Args:
+            url (str): The base URL of the service.
+            retries (int): How many times to retry a submission rejected because of a full queue.
+
+        Returns:
+            None
+        """
+
+        self.url = url.rstrip("/")
+        self.retries = retries
+        return
+
+    def submit_audio(self, samplerate: int, audio: np.ndarray, method: str = "wiener") \
+        -> str:
+        """
+        Submits the audio data as WAV bytes.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            audio (np.ndarray): The audio data to process.
+            method (str): The SoundEnhansement method name.
+
+        Returns:
+            str: The job id.
+        """
+
+        buffer = io.BytesIO()
+        wavfile.write(buffer, samplerate, audio)
+        return self.__submit(f"/jobs?method={parse.quote(method)}", buffer.getvalue(), "audio/wav")
+
+    def submit_file(self, input_path: str, method: str = "wiener", output_path: str | None = None) \
+        -> str:
+        """
+        Submits a reference to a local WAV, FLAC or OGG file.
+
+        Args:
+            input_path (str): The path to the WAV, FLAC or OGG file to process.
+            method (str): The SoundEnhansement method name.
+            output_path (str, optional): Where the service should write the result.
+
+        Returns:
+            str: The job id.
+        """
+
+        body = {"method": method, "input": os.path.abspath(input_path),
+                "output": output_path and os.path.abspath(output_path)}
+        return self.__submit("/jobs", json.dumps(body).encode(), "application/json")
+
+    def status(self, job_id: str) \
+        -> dict:
+        """
+        Returns the job status and metrics.
+        """
+
+        return json.loads(self.__request(f"/jobs/{job_id}"))
+
+    def result(self, job_id: str) \
+        -> tuple[int, np.ndarray]:
+        """
+        Returns the samplerate and the processed audio data of a finished job.
+        """
+
+        with request.urlopen(f"{self.url}/jobs/{job_id}/result") as response:
+            data = io.BytesIO(response.read())
+            if response.headers.get("Content-Type") == "audio/wav":
+                return wavfile.read(data)
+        audio, samplerate = sf.read(data)
+        return samplerate, audio
+
+    def delete(self, job_id: str) \
+        -> None:
+        """
+        Deletes a finished job on the service.
+        """
+
+        self.__request(f"/jobs/{job_id}", method="DELETE")
+        return
+
+    def stats(self) \
+        -> dict:
+        """
+        Returns the service statistics.
+        """
+
+        return json.loads(self.__request("/stats"))
+
+    def wait(self, job_id: str, timeout: float = 60.0, poll: float = 0.05) \
+        -> dict:
+        """
+        Waits until the job is finished.
+
+        Args:
+            job_id (str): The job id.
+            timeout (float): The maximum time to wait, in seconds.
+            poll (float): The polling interval, in seconds.
+
+        Raises:
+            TimeoutError: If the job is not finished in time.
+
+        Returns:
+            dict: The final job status.
+        """
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.status(job_id)
+            if job["status"] in ["done", "failed"]:
+                return job
+            time.sleep(poll)
+        raise TimeoutError(f"Job {job_id} is not finished in {timeout} s.")
+
+    def __submit(self, path: str, body: bytes, content_type: str) \
+        -> str:
+        """
+        Submits a job, backing off while the service queue is full.
+        """
+
+        for attempt in range(self.retries + 1):
+            try:
+                return json.loads(self.__request(path, body, content_type))["id"]
+            except error.HTTPError as e:
+                if e.code != 503 or attempt == self.retries:
+                    raise
+                time.sleep(float(e.headers.get("Retry-After", 1)))
+
+    def __request(self, path: str, body: bytes | None = None, content_type: str | None = None,
+                  method: str | None = None) \
+        -> bytes:
+        """
+        Sends a request to the service and returns the response body.
+        """
+
+        headers = {"Content-Type": content_type} if content_type else {}
+        req = request.Request(self.url + path, data=body, headers=headers, method=method)
+        with request.urlopen(req) as response:
+            return response.read()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local job-queue service for sound enhansement.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--cache-size-mb", type=int, default=512)
+    parser.add_argument("--memory-budget-mb", type=int, default=None)
+    parser.add_argument("--retention", type=int, default=1000, help="finished jobs kept")
+    parser.add_argument("--job-ttl", type=float, default=3600.0, help="seconds a finished job is kept")
+    parser.add_argument("--measure-memory", action="store_true",
+                        help="report the peak memory of the jobs, slows them down")
+    args = parser.parse_args()
+
+    cache = SoundCache(args.cache_dir, args.cache_size_mb * 1024 ** 2) if args.cache_dir else None
+    memory_budget = args.memory_budget_mb * 1024 ** 2 if args.memory_budget_mb else None
+    service = EnhansementService(args.host, args.port, args.workers, args.queue_size,
+                                 cache=cache, memory_budget=memory_budget,
+                                 retention=args.retention, job_ttl=args.job_ttl,
+                                 measure_memory=args.measure_memory)
+    print(f"Serving on {service.url}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        service.stop()
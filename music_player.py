@@ -5,7 +5,6 @@ import pygame
 import json
 
 # Math Imports
-from scipy.io import wavfile
 import numpy as np
 
 # OS imports
@@ -13,9 +12,12 @@ import time
 import os
 
 # Practical Imports
-from sound_tools.sound_enhansement import SoundEnhansement
-from sound_tools.sound_visualizer import SoundWaveform
+from sound_tools.sound_visualizer import SoundWaveform, LiveSpectrum
 from sound_tools.sound_comparison import SoundComparison
+from sound_tools.sound_cache import SoundCache
+from sound_tools.sound_pipeline import ProcessingPipeline
+from sound_tools.sound_io import SoundIO
+from ab_player import ABPlayer
 from helpers import create_temp_file, delete_temp_file, read_markdown
 
 
@@ -25,6 +27,10 @@ class MusicPlayer:
     """
 
     language: dict = {}
+    properties: dict = {}
+    cache: SoundCache
+    pipeline: ProcessingPipeline
+    ab_player: ABPlayer
     filename: str = ""
     tempfilename: str = ""
 
@@ -38,6 +44,15 @@ class MusicPlayer:
     track: tk.StringVar
     proccesing_method: ttk.Combobox
 
+    meter_frame_ms: int = 40
+    meter: LiveSpectrum | None = None
+    meter_audio: np.ndarray | None = None
+    meter_position: int = 0
+    meter_scale: float = 1.0
+    meter_job: str | None = None
+    spectrum_image: tk.PhotoImage
+    level_canvas: tk.Canvas
+
     def __init__(self, window: tk.Tk) \
         -> None:
         """
@@ -62,6 +77,7 @@ class MusicPlayer:
 
         pygame.init()
         pygame.mixer.init()
+        self.ab_player = ABPlayer()
         return
 
     def __init_gui(self) \
@@ -71,13 +87,15 @@ class MusicPlayer:
         """
 
         self.__load_language()
-        self.window.geometry("800x300")
+        self.__init_cache()
+        self.window.geometry("800x450")
         self.window.title(self.language["title"])
         
         self.__init_track_frame()
         self.__init_original_frame()
         self.__init_commands_frame()
         self.__init_proccessed_frame()
+        self.__init_meter_frame()
 
         self.__change_buttons_state("disabled")
         self.__init_menubar()
@@ -91,7 +109,8 @@ class MusicPlayer:
         
         try:
             with open("./properties/properties.json", 'r') as properties:
-                language_name = json.load(properties)["language"]
+                self.properties = json.load(properties)
+                language_name = self.properties["language"]
                 with open(f"./properties/{language_name}.json", 'r', encoding="utf8") as language_file:
                     self.language = json.load(language_file)
         except FileNotFoundError as e:
@@ -100,6 +119,17 @@ class MusicPlayer:
         return
 
 
+    def __init_cache(self) \
+        -> None:
+        """
+        Initializes the cache of processed audio from the properties file.
+        """
+
+        self.cache = SoundCache(self.properties.get("cache_directory", "./.cache"),
+                                self.properties.get("cache_size_mb", 512) * 1024 ** 2)
+        self.pipeline = ProcessingPipeline()
+        return
+
     def __init_menubar(self) \
         -> None:
         """
@@ -129,6 +159,7 @@ class MusicPlayer:
         self.window.bind('<Control-s>', lambda _: self.__save_file())
         self.window.bind('<Control-w>', lambda _: self.__close_file())
         self.window.bind('<Control-q>', lambda _: self.__proper_exit())
+        self.window.bind('<Control-b>', lambda _: self.__switch_ab())
         self.window.protocol("WM_DELETE_WINDOW", self.__proper_exit)
         return
 
@@ -178,13 +209,15 @@ class MusicPlayer:
         -> None:
         """
         Initializes the commands frame which contains the PROCCESS button and 
-        a combobox for selecting the processing method.
+        a combobox for selecting the processing method. The combobox is editable, so a chain
+        of stages such as 'normalize > wiener > output_level(level=-1)' can be typed in.
         """
 
         commands_frame = tk.LabelFrame(self.window, text=self.language["proccess_control_panel"])
         commands_frame.pack(fill=tk.X)
-        self.proccesing_method = ttk.Combobox(commands_frame,
-                     values=[self.language["lib_wiener"], self.language["wiener_filtering"]])
+        self.proccesing_method = ttk.Combobox(commands_frame, width=40,
+                     values=[self.language["lib_wiener"], self.language["wiener_filtering"],
+                             "normalize > wiener > output_level(level=-1)"])
         self.proccesing_method.set(self.language["wiener_filtering"])
         self.proccesing_method.grid(row=0, column=0)
         tk.Button(commands_frame, 
@@ -197,7 +230,8 @@ class MusicPlayer:
         -> None:
         """
         Initializes the processed frame which contains the PLAY, STOP, and SHOW WAVEFORM 
-        buttons for the processed audio.
+        buttons for the processed audio, and the A/B PLAY and A/B SWITCH buttons
+        that compare it with the original one.
         """
         
         proccessed_frame = tk.LabelFrame(self.window, text=self.language["processed_audio_control_panel"])
@@ -214,6 +248,112 @@ class MusicPlayer:
         tk.Button(proccessed_frame, 
                   command=lambda: self.__plot_spectrogram(self.proccessed_audio, self.samplerate), 
                   text=self.language["show_spectrogram"]).grid(row=0, column=3)
+        tk.Button(proccessed_frame, 
+                  command=self.__play_ab, 
+                  text=self.language["ab_play"]).grid(row=1, column=0)
+        tk.Button(proccessed_frame, 
+                  command=self.__switch_ab, 
+                  text=self.language["ab_switch"]).grid(row=1, column=1)
+        return
+
+    def __init_meter_frame(self) \
+        -> None:
+        """
+        Initializes the meter frame which contains the scrolling spectrum and the level meter
+        of the audio that is being played.
+        """
+
+        meter_frame = tk.LabelFrame(self.window, text=self.language["live_meter"])
+        meter_frame.pack(fill=tk.X)
+        self.spectrum_image = tk.PhotoImage(width=400, height=64)
+        tk.Label(meter_frame, image=self.spectrum_image).grid(row=0, column=0)
+        self.level_canvas = tk.Canvas(meter_frame, width=20, height=64, background="black")
+        self.level_canvas.grid(row=0, column=1)
+        return
+
+    def __start_meter(self, audio: np.ndarray) \
+        -> None:
+        """
+        Starts updating the meter from the audio that has just started playing.
+
+        Args:
+            audio (np.ndarray): The audio data that is being played.
+
+        Returns:
+            None
+        """
+
+        self.__stop_meter()
+        if audio is None:
+            return
+
+        self.__set_meter_audio(audio)
+        if self.meter is None or self.meter.samplerate != self.samplerate:
+            self.meter = LiveSpectrum(self.samplerate)
+        self.meter.reset()
+        self.meter_position = 0
+        self.meter_job = self.window.after(self.meter_frame_ms, self.__update_meter)
+        return
+
+    def __set_meter_audio(self, audio: np.ndarray) \
+        -> None:
+        """
+        Sets the audio the meter reads the played samples from, keeping its position.
+
+        Args:
+            audio (np.ndarray): The audio data that is being played.
+
+        Returns:
+            None
+        """
+
+        self.meter_audio = audio
+        self.meter_scale = np.iinfo(audio.dtype).max if np.issubdtype(audio.dtype, np.integer) else 1.0
+        return
+
+    def __stop_meter(self) \
+        -> None:
+        """
+        Stops updating the meter.
+        """
+
+        if self.meter_job is not None:
+            self.window.after_cancel(self.meter_job)
+            self.meter_job = None
+        self.level_canvas.delete("all")
+        return
+
+    def __update_meter(self) \
+        -> None:
+        """
+        Pushes the samples played since the previous frame into the meter and redraws it.
+        """
+
+        if self.ab_player.get_busy():
+            position = self.ab_player.position()
+        elif pygame.mixer.music.get_busy():
+            position = pygame.mixer.music.get_pos() * self.samplerate // 1000
+        else:
+            self.meter_job = None
+            self.level_canvas.delete("all")
+            return
+
+        position = min(position, len(self.meter_audio))
+        if position > self.meter_position:
+            # Only the samples played since the previous frame are converted to mono full scale
+            played = self.meter_audio[max(self.meter_position, position - self.meter.nfft):position]
+            played = played.mean(axis=1) if played.ndim == 2 else played
+            self.meter.push(played / self.meter_scale)
+            self.meter_position = position
+        _, rms_db, peak_db = self.meter.frame()
+
+        self.spectrum_image.configure(data=self.meter.ppm(), format="PPM")
+        self.level_canvas.delete("all")
+        for level, color in [(peak_db, "orange"), (rms_db, "green")]:
+            height = 64 * (1 - level / self.meter.floor_db)
+            self.level_canvas.create_rectangle(4, 64 - height, 18, 64, fill=color, outline="")
+
+        self.meter_job = self.window.after(self.meter_frame_ms, self.__update_meter)
         return
 
     def __plot_waveform(self, audio, samplerate) \
@@ -251,18 +391,20 @@ class MusicPlayer:
     def __browse_file(self) \
         -> None:
         """
-        Opens a file dialog to browse and select an audio file in wav format.
+        Opens a file dialog to browse and select an audio file in wav, flac or ogg format.
         """
 
-        self.filename = filedialog.askopenfilename(filetypes=[("Audio File", "*.wav")])
+        self.filename = filedialog.askopenfilename(filetypes=SoundIO.filetypes)
         if self.filename == "":
             return
 
         temp_path = os.path.dirname(os.path.abspath(__file__))
-        self.tempfilename = create_temp_file(temp_path + "\\" + os.path.basename(self.filename))
+        # The processed audio is always written as float WAV, whatever the input format
+        base_name = os.path.splitext(os.path.basename(self.filename))[0]
+        self.tempfilename = create_temp_file(temp_path + "\\" + base_name + ".wav")
         self.track.set(self.filename)
 
-        self.samplerate, self.audio = wavfile.read(self.filename)
+        self.samplerate, self.audio = SoundIO.read(self.filename)
 
         widgets = self.window.winfo_children()
         for widget in widgets:
@@ -282,11 +424,13 @@ class MusicPlayer:
         Opens a file dialog to save the processed audio file.
         """
 
-        proccessed_filename = filedialog.asksaveasfilename()
+        proccessed_filename = filedialog.asksaveasfilename(filetypes=SoundIO.filetypes[1:], defaultextension=".wav")
         if proccessed_filename == "":
             return
 
-        wavfile.write(proccessed_filename, self.samplerate, self.proccessed_audio)
+        clipped = SoundIO.write(proccessed_filename, self.samplerate, self.proccessed_audio)
+        if clipped:
+            messagebox.showwarning(self.language["clipping"], f"{self.language['clipped_samples']}{clipped}")
         return
     
     def __close_file(self) \
@@ -323,9 +467,11 @@ class MusicPlayer:
             None.
         """
 
+        self.ab_player.stop()
         pygame.mixer.music.load(song)
         pygame.mixer.music.play()
         self.status.set(self.language["playing"])
+        self.__start_meter(self.audio if song == self.filename else self.proccessed_audio)
         return
 
     def __stop_song(self) \
@@ -341,7 +487,39 @@ class MusicPlayer:
         """
 
         pygame.mixer.music.stop()
+        self.ab_player.stop()
         self.status.set(self.language["stopped"])
+        self.__stop_meter()
+        return
+
+    def __play_ab(self) \
+        -> None:
+        """
+        Plays the original and the processed audio together from the start, the original one audible.
+        """
+
+        if self.audio is None or self.proccessed_audio is None:
+            return
+
+        pygame.mixer.music.stop()
+        self.ab_player.play(self.samplerate, self.audio, self.proccessed_audio)
+        self.status.set(f"{self.language['playing']}: {self.language['ab_original']}")
+        self.__start_meter(self.audio)
+        return
+
+    def __switch_ab(self) \
+        -> None:
+        """
+        Switches between the original and the processed audio at the current position.
+        """
+
+        if not self.ab_player.get_busy():
+            return
+
+        active = self.ab_player.switch()
+        self.status.set(f"{self.language['playing']}: "
+                        + self.language["ab_processed" if active else "ab_original"])
+        self.__set_meter_audio(self.proccessed_audio if active else self.audio)
         return
 
     def __proccess_song(self) \
@@ -352,20 +530,52 @@ class MusicPlayer:
 
         processing_type = self.proccesing_method.get()
 
-        start_time = time.time()
         if processing_type == self.language["wiener_filtering"]:
-            self.proccessed_audio = SoundEnhansement.wiener(self.samplerate, self.audio)
+            stages = [("wiener", {})]
+        elif processing_type == self.language["lib_wiener"]:
+            stages = [("lib_wiener", {})]
         else:
-            self.proccessed_audio = SoundEnhansement.lib_wiener(self.samplerate, self.audio)
+            try:
+                stages = ProcessingPipeline.parse(processing_type)
+            except ValueError as e:
+                messagebox.showerror(self.language["invalid_chain"], str(e))
+                return
+
+        # Single methods share the cache entries with the other tools
+        method, params = (stages[0][0], {}) if stages in [[("wiener", {})], [("lib_wiener", {})]] \
+            else ("pipeline", {"stages": stages})
+        computed, stats = 0, {}
+
+        def process(samplerate, audio, **_):
+            nonlocal computed
+            processed_audio, computed = self.pipeline.run(samplerate, audio, stages, stats)
+            return processed_audio
+
+        def get_metrics(processed_audio):
+            SoundIO.write(self.tempfilename, self.samplerate, processed_audio)
+            centroid_diff, mean_diff = SoundComparison.compare_audio(self.filename, self.tempfilename)
+            metrics = {"centroid_diff": float(centroid_diff), "mean_diff": float(mean_diff)}
+            # The sparse stages report the skipped silence, stored with the metrics for the cache hits
+            if "skipped_fraction" in stats:
+                metrics["skipped_fraction"] = float(np.mean(stats["skipped_fraction"]))
+            return metrics
+
+        start_time = time.time()
+        self.proccessed_audio, metrics, cache_hit = self.cache.process(self.samplerate, self.audio, method, params,
+                                                                       get_metrics=get_metrics, function=process)
         end_time = time.time()
         time_taken = end_time - start_time
 
-        wavfile.write(self.tempfilename, self.samplerate, self.proccessed_audio)
-        centroid_diff, mean_diff = SoundComparison.compare_audio(self.filename, self.tempfilename)
+        if cache_hit:
+            SoundIO.write(self.tempfilename, self.samplerate, self.proccessed_audio)
+        centroid_diff, mean_diff = metrics["centroid_diff"], metrics["mean_diff"]
         messagebox.showinfo(self.language["processing_time"], 
             f"{self.language["time_taken"]}{time_taken:.4f}"
                             + f"\n{self.language["centroid_diff"]}{centroid_diff:.4f}"
-                            + f"\n{self.language["mean_diff"]}{mean_diff:.4f}")
+                            + f"\n{self.language["mean_diff"]}{mean_diff:.4f}"
+                            + f"\n{self.language["stages_computed"]}{computed}/{len(stages)}"
+                            + (f"\n{self.language['skipped_fraction']}{metrics['skipped_fraction'] * 100:.1f}"
+                               if "skipped_fraction" in metrics else ""))
         self.__change_buttons_state("normal")
         self.submenu.entryconfig(self.language["save"], state="normal")
         self.submenu.entryconfig(self.language["close"], state="normal")
@@ -428,6 +638,9 @@ class MusicPlayer:
         """
 
         delete_temp_file(self.tempfilename)
+        self.ab_player.stop()
+        if self.meter_job is not None:
+            self.window.after_cancel(self.meter_job)
         self.window.destroy()
         return
         
\ No newline at end of file
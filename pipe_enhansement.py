@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from collections import deque
+from sound_tools.sound_io import SoundIO
+from sound_tools.sound_streaming import StreamingEnhansement
+
+
+def timed(blocks, read_times):
+    """
+    Passes the blocks through, remembering when each of them was read.
+    """
+
+    for block in blocks:
+        read_times.append(time.perf_counter())
+        yield block
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Enhanses raw PCM or WAV from stdin and writes raw PCM to stdout as it goes.",
+        epilog="example: sox in.flac -t raw -e signed -b 16 -c 2 -r 44100 - | "
+               "python pipe_enhansement.py -r 44100 -c 2 | aplay -f S16_LE -c 2 -r 44100")
+    parser.add_argument("--method", default="wiener", choices=["wiener", "lib_wiener"])
+    parser.add_argument("-r", "--samplerate", type=int, default=44100, help="samplerate of raw input")
+    parser.add_argument("-c", "--channels", type=int, default=1, help="channels of raw input")
+    parser.add_argument("-f", "--format", default="s16le", choices=list(SoundIO.pcm_formats),
+                        help="sample format of raw input")
+    parser.add_argument("-o", "--output-format", default=None, choices=list(SoundIO.pcm_formats),
+                        help="sample format of the output, the input format by default")
+    parser.add_argument("--block-size", type=int, default=4096, help="frames read and written at once")
+    parser.add_argument("--warmup", type=float, default=10.0,
+                        help="maximal seconds of input buffered to design the filter")
+    parser.add_argument("--psd-tolerance", type=float, default=0.001,
+                        help="start the wiener output once its noise estimate changes less than that")
+    args = parser.parse_args()
+
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    samplerate, channels, sample_format = args.samplerate, args.channels, args.format
+    if stdin.peek(4)[:4] == b"RIFF":
+        samplerate, channels, sample_format = SoundIO.read_wav_header(stdin)
+    output_format = args.output_format or sample_format
+
+    # Every output block is written and flushed before the next one is read, so a slow
+    # reader blocks this process instead of letting the buffers grow
+    read_times, latencies = deque(), []
+    stats = {}
+    frames, clipped, first_output, buffered = 0, 0, None, 0
+    started = time.perf_counter()
+    blocks = timed(SoundIO.read_pcm_blocks(stdin, sample_format, channels, args.block_size), read_times)
+    try:
+        for block in StreamingEnhansement.single_pass(args.method, samplerate, blocks,
+                                                      int(args.warmup * samplerate), args.psd_tolerance, stats):
+            if SoundIO.pcm_formats[output_format][1] is not None:
+                clipped += int(np.count_nonzero(np.abs(block) > 1))
+            stdout.write(SoundIO.encode_pcm(block, output_format))
+            stdout.flush()
+
+            written = time.perf_counter()
+            if first_output is None:
+                first_output, buffered = written, len(read_times)
+            latencies.append(written - read_times.popleft())
+            frames += len(block)
+    except BrokenPipeError:
+        # The reader went away, redirect stdout so the interpreter does not fail on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    elapsed = time.perf_counter() - started
+
+    audio_seconds = frames / samplerate
+    input_bytes = frames * channels * SoundIO.pcm_formats[sample_format][0]
+    print(f"{args.method}: {frames} frames, {channels} ch, {samplerate} Hz, {sample_format} -> {output_format}",
+          file=sys.stderr)
+    print(f"throughput: {audio_seconds:.2f} s of audio in {elapsed:.2f} s, "
+          f"{audio_seconds / max(elapsed, 1e-9):.1f}x realtime, {input_bytes / max(elapsed, 1e-9) / 1e6:.2f} MB/s",
+          file=sys.stderr)
+    if latencies:
+        print(f"latency: first output after {(first_output - started) * 1000:.0f} ms, "
+              f"{stats.get('warmup_frames', 0) / samplerate:.2f} s of audio buffered for the filter design",
+              file=sys.stderr)
+    if len(latencies) > buffered:
+        # Blocks read after the filter design, from read to written
+        latencies_ms = np.array(latencies[buffered:]) * 1000
+        print(f"block latency: mean {np.mean(latencies_ms):.2f} ms, p95 {np.percentile(latencies_ms, 95):.2f} ms, "
+              f"max {np.max(latencies_ms):.2f} ms", file=sys.stderr)
+    if clipped:
+        print(f"clipped: {clipped} samples", file=sys.stderr)
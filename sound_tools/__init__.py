@@ -4,4 +4,6 @@ visualization, and comparison.
 """
 
 
-__all__ = ['sound_enhansement', 'sound_visualizer', 'sound_comparison']
+__all__ = ['sound_enhansement', 'sound_visualizer', 'sound_comparison', 'sound_cache',
+           'sound_streaming', 'memory_budget', 'sound_pipeline',
+           'sound_activity', 'sound_io']
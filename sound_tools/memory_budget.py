@@ -0,0 +1,199 @@
+"""
+This is the memory_budget module. It provides MemoryBudget class
+to estimate the peak memory of the enhansement methods and to keep them within a budget.
+"""
+
+
+import numpy as np
+
+import threading
+import tracemalloc
+
+from typing import Any, Callable, Tuple
+
+from sound_tools.sound_enhansement import SoundEnhansement
+from sound_tools.sound_streaming import StreamingEnhansement
+
+
+class MemoryBudget:
+    """
+    Class that estimates the peak memory of the enhansement methods and chooses
+    between the in-memory and the chunked strategy before allocating anything.
+
+    The estimates are in bytes, not counting the input data itself, and are
+    calibrated with tracemalloc to be slightly pessimistic.
+    """
+
+    # The lib_wiener filter length, its design allocates several n x n matrices
+    lib_wiener_n: int = 1024
+
+    # Small allocations that do not depend on the input size
+    overhead: int = 256 * 1024
+
+    # Chunk sizes in frames, tried from the largest to the smallest
+    chunk_sizes: list = [2 ** power for power in range(20, 11, -1)]
+
+    # The samplerate SoundComparison.compare_audio resamples both files to
+    metrics_samplerate: int = 22050
+
+    # The tracemalloc peak is process-wide, so only one call is measured at a time
+    measure_lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def estimate(method: str, shape: Tuple[int, ...], dtype: np.dtype = np.float64,
+                 chunk_size: int | None = None) \
+        -> int:
+        """
+        Estimates the peak memory of the method for the given input.
+
+        Args:
+            method (str): The method name, 'wiener' or 'lib_wiener'.
+            shape (Tuple[int, ...]): The shape of the audio data, (frames,) or (frames, channels).
+            dtype (np.dtype): The dtype of the audio data.
+            chunk_size (int, optional): The chunk size of the chunked strategy.
+                Defaults to None, which estimates the in-memory strategy.
+
+        Raises:
+            ValueError: If the method is unknown.
+
+        Returns:
+            int: The estimated peak memory in bytes.
+        """
+
+        SoundEnhansement.get_method(method)
+        frames = shape[0]
+        channels = shape[1] if len(shape) > 1 else 1
+        itemsize = np.dtype(dtype).itemsize
+        design = 9 * MemoryBudget.lib_wiener_n ** 2 if method == "lib_wiener" else 0
+
+        # The chunked strategy keeps only the output and the work arrays of one chunk
+        if chunk_size is not None:
+            chunk = min(chunk_size, frames)
+            return 8 * channels * frames + 80 * channels * chunk + design + MemoryBudget.overhead
+
+        # Normalized copy, Welch segments and their spectra, the convolution result
+        if method == "wiener":
+            return max(40 * frames + 8 * (channels - 1) * frames, 16 * channels * frames) + MemoryBudget.overhead
+
+        # Two full-length correlations, the normal equations and the filter output
+        return (48 + 2 * itemsize) * frames + 8 * (channels - 1) * frames + design + MemoryBudget.overhead
+
+    @staticmethod
+    def estimate_metrics(shape: Tuple[int, ...], samplerate: int) \
+        -> int:
+        """
+        Estimates the peak memory of SoundComparison.compare_audio on the original and the
+        processed audio, including the processed float64 audio that is still held meanwhile.
+
+        Both files are loaded as float32 mono at 22050 Hz and kept, and the STFTs of one of
+        them, their magnitudes and powers take about 64 bytes per resampled sample. Loading
+        a file needs its native samples as float32 and their mono mix.
+
+        Args:
+            shape (Tuple[int, ...]): The shape of the audio data, (frames,) or (frames, channels).
+            samplerate (int): The samplerate of the audio data.
+
+        Returns:
+            int: The estimated peak memory in bytes.
+        """
+
+        frames = shape[0]
+        channels = shape[1] if len(shape) > 1 else 1
+        resampled = frames * MemoryBudget.metrics_samplerate // samplerate + 1
+        load = 4 * channels * frames + 4 * frames
+        return 8 * channels * frames + 8 * resampled + max(load, 64 * resampled) + MemoryBudget.overhead
+
+    @staticmethod
+    def plan(method: str, shape: Tuple[int, ...], dtype: np.dtype, budget: int) \
+        -> int | None:
+        """
+        Chooses the strategy that fits into the budget.
+
+        Args:
+            method (str): The method name, 'wiener' or 'lib_wiener'.
+            shape (Tuple[int, ...]): The shape of the audio data.
+            dtype (np.dtype): The dtype of the audio data.
+            budget (int): The memory budget in bytes.
+
+        Raises:
+            MemoryError: If even the smallest chunk does not fit into the budget.
+
+        Returns:
+            int | None: None for the in-memory strategy, or the chunk size for the chunked one.
+        """
+
+        if MemoryBudget.estimate(method, shape, dtype) <= budget:
+            return None
+        for chunk_size in MemoryBudget.chunk_sizes:
+            if MemoryBudget.estimate(method, shape, dtype, chunk_size) <= budget:
+                return chunk_size
+
+        needed = MemoryBudget.estimate(method, shape, dtype, MemoryBudget.chunk_sizes[-1])
+        raise MemoryError(f"{method} needs at least {needed / 1024 ** 2:.1f} MB for audio of shape {shape}, "
+                          f"but the budget is {budget / 1024 ** 2:.1f} MB.")
+
+    @staticmethod
+    def measure(function: Callable[..., Any], *args, **kwargs) \
+        -> Tuple[Any, int]:
+        """
+        Calls the function and measures its peak memory with tracemalloc.
+
+        NumPy reports its buffers to tracemalloc, so the arrays are counted. Tracing is on
+        only during the call, since it slows down every allocation. The peak is process-wide,
+        so the measured calls wait for each other, and allocations made by other threads at
+        the same time are counted as well.
+
+        Args:
+            function (Callable[..., Any]): The function to call.
+
+        Returns:
+            Tuple[Any, int]: The function result and the peak memory in bytes.
+        """
+
+        with MemoryBudget.measure_lock:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                result = function(*args, **kwargs)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                if started:
+                    tracemalloc.stop()
+        return result, peak - baseline
+
+    @staticmethod
+    def run(method: str, samplerate: int, data: np.ndarray, budget: int | None = None,
+            measure: bool = True) \
+        -> Tuple[np.ndarray, int | None, int | None]:
+        """
+        Applies the method within the memory budget.
+
+        Args:
+            method (str): The method name, 'wiener' or 'lib_wiener'.
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The audio data.
+            budget (int, optional): The memory budget in bytes. Defaults to None, which
+                always uses the in-memory strategy.
+            measure (bool): Whether to measure the peak memory, see measure.
+
+        Raises:
+            MemoryError: If the method cannot fit into the budget.
+
+        Returns:
+            Tuple[np.ndarray, int | None, int | None]: The filtered data, the chunk size used or None
+            for the in-memory strategy, and the measured peak memory in bytes or None if not measured.
+        """
+
+        chunk_size = None if budget is None else MemoryBudget.plan(method, data.shape, data.dtype, budget)
+        if chunk_size is None:
+            function, args = SoundEnhansement.get_method(method), (samplerate, data)
+        else:
+            function, args = StreamingEnhansement.process_array, (method, samplerate, data, chunk_size)
+
+        if not measure:
+            return function(*args), chunk_size, None
+        filtered_data, peak = MemoryBudget.measure(function, *args)
+        return filtered_data, chunk_size, peak
@@ -0,0 +1,226 @@
+"""
+This is the sound_activity module. It provides SoundActivity class
+to detect silent regions and apply the enhansement methods only to the active ones.
+"""
+
+
+# Math imports
+import numpy as np
+from scipy import signal
+
+# Other imports
+from typing import Callable, List, Tuple
+
+from sound_tools.sound_enhansement import SoundEnhansement
+from sound_tools.sound_streaming import WelchAccumulator, AutocorrelationAccumulator
+
+
+class SoundActivity:
+    """
+    Class that contains the silence-aware versions of the enhansement methods.
+
+    A cheap frame energy pass marks the active frames. The filters are designed from the
+    active regions only and applied to them with enough context before and after, so the
+    output there is the same as filtering the whole signal. The rest is only scaled by
+    the average filter gain.
+    """
+
+    @staticmethod
+    def get_method(name: str) \
+        -> Callable[..., Tuple[np.ndarray, float]]:
+        """
+        Returns the silence-aware version of the enhansement method with the given name.
+
+        Args:
+            name (str): The method name, 'wiener' or 'lib_wiener'.
+
+        Raises:
+            ValueError: If there is no method with such name.
+
+        Returns:
+            Callable[..., Tuple[np.ndarray, float]]: The method that takes a samplerate and audio data,
+            and returns the filtered data and the fraction of skipped samples.
+        """
+
+        methods = {
+            "wiener": SoundActivity.wiener,
+            "lib_wiener": SoundActivity.lib_wiener,
+        }
+        if name not in methods:
+            raise ValueError(f"Unknown enhansement method: {name}")
+        return methods[name]
+
+    @staticmethod
+    def detect(data: np.ndarray, frame_size: int = 1024, threshold_db: float = -60.0) \
+        -> np.ndarray:
+        """
+        Marks the frames whose RMS level is above the threshold relative to the signal peak.
+
+        Args:
+            data (np.ndarray): The samples of a single channel.
+            frame_size (int): The number of samples in a frame.
+            threshold_db (float): The threshold in dB relative to the absolute maximum.
+
+        Returns:
+            np.ndarray: A boolean array with a value for every frame, the last one may be shorter.
+        """
+
+        data = np.asarray(data, dtype=np.float64)
+        frames = -(-len(data) // frame_size)
+        padded = np.zeros(frames * frame_size)
+        padded[:len(data)] = data
+        energy = np.mean(padded.reshape(frames, frame_size) ** 2, axis=1)
+
+        peak = np.max(np.abs(data), initial=0)
+        return energy > peak ** 2 * 10 ** (threshold_db / 10)
+
+    @staticmethod
+    def get_regions(active: np.ndarray, frame_size: int, length: int, context: int) \
+        -> List[Tuple[int, int]]:
+        """
+        Converts the active frames into sample ranges that include the filter tail.
+
+        Regions that would overlap after adding the context of the filter are merged,
+        so every region can be filtered on its own.
+
+        Args:
+            active (np.ndarray): The active frames from detect.
+            frame_size (int): The number of samples in a frame.
+            length (int): The number of samples in the signal.
+            context (int): The filter length minus one.
+
+        Returns:
+            List[Tuple[int, int]]: The start and end of every region, the end includes the filter tail.
+        """
+
+        changes = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+        starts = np.flatnonzero(changes == 1) * frame_size
+        ends = np.flatnonzero(changes == -1) * frame_size
+
+        regions = []
+        for start, end in zip(starts, ends):
+            start, end = int(min(start, length)), int(min(end + context, length))
+            if regions and start - context <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], end)
+            else:
+                regions.append((start, end))
+        return regions
+
+    @staticmethod
+    def apply(data: np.ndarray, taps: np.ndarray, regions: List[Tuple[int, int]]) \
+        -> np.ndarray:
+        """
+        Filters the regions with their preceding context and scales the rest by the average gain.
+
+        Args:
+            data (np.ndarray): The samples of a single channel.
+            taps (np.ndarray): The filter taps.
+            regions (List[Tuple[int, int]]): The regions from get_regions.
+
+        Returns:
+            np.ndarray: The filtered samples.
+        """
+
+        context = len(taps) - 1
+        gain = np.mean(np.abs(np.fft.rfft(taps)))
+        filtered_data = data * gain
+        for start, end in regions:
+            warmup = max(start - context, 0)
+            filtered = signal.fftconvolve(data[warmup:end], taps)[:end - warmup]
+            filtered_data[start:end] = filtered[start - warmup:]
+        return filtered_data
+
+    @staticmethod
+    def wiener(samplerate: int, data: np.ndarray, threshold_db: float = -60.0, frame_size: int = 1024,
+               stats: dict | None = None) \
+        -> Tuple[np.ndarray, float]:
+        """
+        Applies the custom Wiener filter, skipping the silent regions.
+
+        The Welch PSD is accumulated over the active regions only but divided by the number
+        of segments of the whole signal, since silent segments add next to nothing to it.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The input data to be filtered.
+            threshold_db (float): The silence threshold in dB relative to the channel peak.
+            frame_size (int): The number of samples in a detection frame.
+            stats (dict, optional): If given, the fraction of skipped samples is appended
+                to its 'skipped_fraction' list.
+
+        Returns:
+            Tuple[np.ndarray, float]: The filtered data and the fraction of skipped samples.
+        """
+
+        def process_channel(channel):
+            normalized = channel / np.max(np.abs(channel))
+            active = SoundActivity.detect(normalized, frame_size, threshold_db)
+
+            estimate = WelchAccumulator(samplerate)
+            for start, end in SoundActivity.get_regions(active, frame_size, len(normalized), 0):
+                estimate.update(normalized[start:end])
+                estimate.break_stream()
+            segments = max((len(normalized) - estimate.noverlap) // (estimate.nperseg - estimate.noverlap), 1)
+            taps = SoundEnhansement.wiener_taps(estimate.freqs, estimate.total / segments)
+
+            regions = SoundActivity.get_regions(active, frame_size, len(normalized), len(taps) - 1)
+            return SoundActivity.apply(normalized, taps, regions), regions
+
+        return SoundActivity.__process_channels(data, process_channel, stats)
+
+    @staticmethod
+    def lib_wiener(samplerate: int, data: np.ndarray, threshold_db: float = -60.0, frame_size: int = 1024,
+                   stats: dict | None = None) \
+        -> Tuple[np.ndarray, float]:
+        """
+        Applies the SciPy Lib Wiener filter, skipping the silent regions.
+
+        The autocorrelation is accumulated over the active regions only.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The input data to be filtered.
+            threshold_db (float): The silence threshold in dB relative to the channel peak.
+            frame_size (int): The number of samples in a detection frame.
+            stats (dict, optional): If given, the fraction of skipped samples is appended
+                to its 'skipped_fraction' list.
+
+        Returns:
+            Tuple[np.ndarray, float]: The filtered data and the fraction of skipped samples.
+        """
+
+        wiener_n = 1024
+
+        def process_channel(channel):
+            active = SoundActivity.detect(channel, frame_size, threshold_db)
+
+            estimate = AutocorrelationAccumulator(wiener_n)
+            for start, end in SoundActivity.get_regions(active, frame_size, len(channel), 0):
+                estimate.update(channel[start:end])
+                estimate.break_stream()
+            R = np.concatenate([estimate.acf[:0:-1], estimate.acf])
+            h = SoundEnhansement.lib_wiener_taps(R, estimate.acf)
+
+            regions = SoundActivity.get_regions(active, frame_size, len(channel), wiener_n - 1)
+            return SoundActivity.apply(channel, h, regions), regions
+
+        return SoundActivity.__process_channels(data, process_channel, stats)
+
+    @staticmethod
+    def __process_channels(data: np.ndarray, process_channel: Callable, stats: dict | None) \
+        -> Tuple[np.ndarray, float]:
+        """
+        Applies the function to every channel and counts the skipped samples.
+        """
+
+        channels = np.transpose(data) if data.ndim == 2 else [data]
+        filtered, processed = [], 0
+        for channel in channels:
+            filtered_channel, regions = process_channel(np.asarray(channel, dtype=np.float64))
+            filtered.append(filtered_channel)
+            processed += sum(end - start for start, end in regions)
+
+        skipped = 1 - processed / max(data.size, 1)
+        if stats is not None:
+            stats.setdefault("skipped_fraction", []).append(skipped)
+        return (np.transpose(filtered) if data.ndim == 2 else filtered[0]), skipped
@@ -0,0 +1,246 @@
+"""
+This is the sound_cache module. It provides SoundCache class
+to store processed audio on disk and reuse it instead of reprocessing.
+"""
+
+
+import numpy as np
+
+import os
+import json
+import hashlib
+import inspect
+import tempfile
+import threading
+
+from typing import Callable, Tuple
+
+from sound_tools.sound_enhansement import SoundEnhansement
+
+
+class SoundCache:
+    """
+    Persistent LRU cache of processed audio.
+
+    Entries are keyed by the hash of the input data, the method name, its parameters
+    and the version of the enhansement code. The audio is stored as a float32 .npy blob
+    that is memory-mapped on read, and the metrics are stored next to it as JSON.
+    """
+
+    # The code version is computed once per process
+    version: str | None = None
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 ** 2) \
+        -> None:
+        """
+        Initializes the cache in the given directory.
+
+        Args:
+            directory (str): The directory to store the entries in. Created if missing.
+            max_bytes (int): The total size of the entries above which the least
+                recently used ones are evicted.
+
+        Returns:
+            None
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        return
+
+    @staticmethod
+    def code_version() \
+        -> str:
+        """
+        Returns the hash of the sound_tools code, so the entries are invalidated when it changes.
+        """
+
+        if SoundCache.version is not None:
+            return SoundCache.version
+
+        version = hashlib.sha256()
+        package = os.path.dirname(inspect.getsourcefile(SoundEnhansement))
+        for name in sorted(os.listdir(package)):
+            if name.endswith(".py"):
+                with open(os.path.join(package, name), 'rb') as source:
+                    version.update(source.read())
+        SoundCache.version = version.hexdigest()[:16]
+        return SoundCache.version
+
+    @staticmethod
+    def make_key(samplerate: int, data: np.ndarray, method: str, params: dict | None = None) \
+        -> str:
+        """
+        Creates the cache key for the input data and processing settings.
+
+        Args:
+            samplerate (int): The samplerate of the input data.
+            data (np.ndarray): The input audio data.
+            method (str): The name of the processing method.
+            params (dict, optional): The parameters of the method.
+
+        Returns:
+            str: The hexadecimal key.
+        """
+
+        data = np.ascontiguousarray(data)
+        key = hashlib.sha256()
+        key.update(f"{samplerate}|{data.dtype.str}|{data.shape}|".encode())
+        key.update(memoryview(data).cast('B'))
+        key.update(f"|{method}|{json.dumps(params or {}, sort_keys=True)}|".encode())
+        key.update(SoundCache.code_version().encode())
+        return key.hexdigest()
+
+    def get(self, key: str) \
+        -> Tuple[np.ndarray, dict] | None:
+        """
+        Returns the cached audio and metrics, or None on a cache miss.
+
+        Args:
+            key (str): The key from make_key.
+
+        Returns:
+            Tuple[np.ndarray, dict] | None: The read-only memory-mapped audio and its metrics.
+        """
+
+        audio_path, metrics_path = self.__paths(key)
+        try:
+            audio = np.load(audio_path, mmap_mode='r')
+            with open(metrics_path, 'r') as metrics_file:
+                metrics = json.load(metrics_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # Touch the entry, so the eviction sees it as recently used. It may have been
+        # evicted meanwhile, the memory-mapped audio stays readable then
+        for path in [audio_path, metrics_path]:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        return audio, metrics
+
+    def put(self, key: str, audio: np.ndarray, metrics: dict) \
+        -> None:
+        """
+        Stores the audio and metrics and evicts the least recently used entries if needed.
+
+        Concurrent writers of the same key write the same entry, so whichever replaces
+        the files last wins.
+
+        Args:
+            key (str): The key from make_key.
+            audio (np.ndarray): The processed audio data, stored as float32.
+            metrics (dict): JSON-serializable metrics of the processed audio.
+
+        Returns:
+            None
+        """
+
+        audio_path, metrics_path = self.__paths(key)
+
+        # Write to temporary files of this writer first, so readers never see a partial entry
+        audio_file, audio_temp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        metrics_file, metrics_temp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(audio_file, 'wb') as audio_file:
+                np.save(audio_file, np.asarray(audio, dtype=np.float32))
+            with os.fdopen(metrics_file, 'w') as metrics_file:
+                json.dump(metrics, metrics_file)
+            os.replace(metrics_temp, metrics_path)
+            os.replace(audio_temp, audio_path)
+        except FileNotFoundError:
+            # The directory was cleared meanwhile, the entry is simply not stored
+            pass
+        finally:
+            for path in [audio_temp, metrics_temp]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.__evict()
+        return
+
+    def process(self, samplerate: int, data: np.ndarray, method: str, params: dict | None = None,
+                get_metrics: Callable[[np.ndarray], dict] | None = None,
+                function: Callable[..., np.ndarray] | None = None) \
+        -> Tuple[np.ndarray, dict, bool]:
+        """
+        Returns the cached result of the SoundEnhansement method, or computes and stores it.
+
+        Args:
+            samplerate (int): The samplerate of the input data.
+            data (np.ndarray): The input audio data.
+            method (str): The SoundEnhansement method name.
+            params (dict, optional): Keyword parameters of the method.
+            get_metrics (Callable[[np.ndarray], dict], optional): A function that computes
+                the metrics of the processed audio on a cache miss.
+            function (Callable[..., np.ndarray], optional): A replacement of the method that
+                gives the same result, e.g. one that runs within a memory budget.
+
+        Returns:
+            Tuple[np.ndarray, dict, bool]: The processed audio as float32, the same as it is
+            stored, its metrics and whether it was a cache hit.
+        """
+
+        key = self.make_key(samplerate, data, method, params)
+        cached = self.get(key)
+        if cached is not None:
+            return *cached, True
+
+        function = function or SoundEnhansement.get_method(method)
+        processed = np.asarray(function(samplerate, data, **(params or {})), dtype=np.float32)
+        metrics = get_metrics(processed) if get_metrics is not None else {}
+        self.put(key, processed, metrics)
+        return processed, metrics, False
+
+    def clear(self) \
+        -> None:
+        """
+        Deletes all entries.
+        """
+
+        with self.lock:
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+        return
+
+    def __paths(self, key: str) \
+        -> Tuple[str, str]:
+        """
+        Returns the paths to the audio and metrics files of the entry.
+        """
+
+        return os.path.join(self.directory, key + ".npy"), os.path.join(self.directory, key + ".json")
+
+    def __evict(self) \
+        -> None:
+        """
+        Deletes the least recently used entries until the total size fits into max_bytes.
+        """
+
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".npy"):
+                    continue
+                audio_path, metrics_path = self.__paths(name[:-len(".npy")])
+                try:
+                    stat = os.stat(audio_path)
+                    size = stat.st_size + os.path.getsize(metrics_path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, size, audio_path, metrics_path))
+
+            total = sum(entry[1] for entry in entries)
+            for _, size, audio_path, metrics_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for path in [audio_path, metrics_path]:
+                    try:
+                        os.remove(path)
+                    except (FileNotFoundError, PermissionError):
+                        pass
+                total -= size
+        return
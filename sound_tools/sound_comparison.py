@@ -6,6 +6,8 @@ to work with different audio comparison methods.
 
 import numpy as np
 import librosa
+import soundfile as sf
+from scipy import signal, stats
 
 from typing import Tuple
 
@@ -49,6 +51,24 @@ class SoundComparison:
         centroid_1, mean_1 = SoundComparison.get_spectral_properties(y_1)
         centroid_2, mean_2 = SoundComparison.get_spectral_properties(y_2)
 
+        return SoundComparison.get_difference(centroid_1, mean_1, centroid_2, mean_2)
+
+    @staticmethod
+    def get_difference(centroid_1: float, mean_1: float, centroid_2: float, mean_2: float) \
+        -> Tuple[float, float]:
+        """
+        Calculates the percentage difference between the spectral properties of two signals.
+
+        Args:
+            centroid_1 (float): The mean spectral centroid of the first signal.
+            mean_1 (float): The mean spectral flatness of the first signal.
+            centroid_2 (float): The mean spectral centroid of the second signal.
+            mean_2 (float): The mean spectral flatness of the second signal.
+
+        Returns:
+            Tuple[float, float]: The percentage difference in spectral centroid and mean spectral flatness.
+        """
+
         epsilon = 1e-10
         centroid_1_nonzero = np.where(centroid_1 == 0, epsilon, centroid_1)
         centroid_2_nonzero = np.where(centroid_2 == 0, epsilon, centroid_2)
@@ -59,3 +79,115 @@ class SoundComparison:
         mean_diff = (np.abs(mean_1_nonzero - mean_2_nonzero) / (centroid_1_nonzero+ centroid_2_nonzero) * 100)
         
         return centroid_diff, mean_diff
+
+    @staticmethod
+    def estimate_spectral_properties(filepath: str, error_bound: float = 0.01, confidence: float = 0.95,
+                                     initial_frames: int = 32, seed: int | None = None) \
+        -> Tuple[Tuple[float, float], Tuple[float, float], int]:
+        """
+        Estimates the mean spectral centroid and flatness of an audio file from a stratified
+        sample of STFT frames read directly from the disk.
+
+        The frames mimic those of get_spectral_properties on librosa.load output: every
+        sampled frame is read with a small margin and resampled to 22050 Hz. The number of
+        sampled frames is doubled, keeping the frames already read, until both confidence
+        intervals are within the error bound relative to the estimate, or all frames are read.
+
+        Args:
+            filepath (str): The path to the audio file.
+            error_bound (float): The wanted half-width of the confidence intervals, relative to the means.
+            confidence (float): The confidence level of the intervals.
+            initial_frames (int): The number of frames sampled first.
+            seed (int, optional): The seed of the random frame choice.
+
+        Returns:
+            Tuple[Tuple[float, float], Tuple[float, float], int]: The spectral centroid and the mean
+            spectral flatness, each with the half-width of its confidence interval, and the number
+            of frames read.
+        """
+
+        rng = np.random.default_rng(seed)
+        z = stats.norm.ppf(0.5 + confidence / 2)
+
+        sr, n_fft, hop_length, margin = 22050, 2048, 512, 1024
+        window = signal.get_window('hann', n_fft)
+        freqs = np.fft.rfftfreq(n_fft, 1 / sr)
+
+        with sf.SoundFile(filepath) as audio_file:
+            scale = audio_file.samplerate / sr
+            total = 1 + int(np.ceil(audio_file.frames / scale)) // hop_length
+
+            def read_frame(index):
+                # Read the frame with a margin, so resampling it matches librosa.load
+                start = index * hop_length - n_fft // 2 - margin
+                native_start = int(np.floor(start * scale))
+                audio_file.seek(max(native_start, 0))
+                native_length = int(np.ceil((n_fft + 2 * margin) * scale)) + 1 - max(-native_start, 0)
+                samples = audio_file.read(native_length, dtype='float64', always_2d=True).mean(axis=1)
+                segment = np.zeros(max(-native_start, 0) + len(samples))
+                segment[max(-native_start, 0):] = samples
+                if audio_file.samplerate != sr:
+                    segment = librosa.resample(segment, orig_sr=audio_file.samplerate, target_sr=sr)
+
+                frame = np.zeros(n_fft)
+                resampled = segment[margin:margin + n_fft]
+                frame[:len(resampled)] = resampled
+                if start + margin < 0:
+                    frame[:-(start + margin)] = 0
+
+                S = np.abs(np.fft.rfft(frame * window))
+                centroid = np.sum(freqs * S) / np.sum(S) if np.sum(S) > 0 else 0.0
+                power = np.maximum(S ** 2, 1e-10)
+                flatness = np.exp(np.mean(np.log(power))) / np.mean(power)
+                return centroid, flatness
+
+            # One frame in every stratum, when the strata are halved the new frame goes to the empty half
+            count = min(initial_frames, total)
+            edges = np.linspace(0, total, count + 1).astype(int)
+            indices = [int(rng.integers(low, high)) for low, high in zip(edges[:-1], edges[1:])]
+            values = [read_frame(index) for index in indices]
+
+            while True:
+                centroids, flatnesses = np.transpose(values)
+                n = len(values)
+                correction = np.sqrt(max(1 - n / total, 0))
+                intervals = [z * np.std(x, ddof=1) / np.sqrt(n) * correction if n > 1 else np.inf
+                             for x in [centroids, flatnesses]]
+                means = [np.mean(centroids), np.mean(flatnesses)]
+
+                if n >= total or all(interval <= error_bound * abs(mean) for interval, mean in zip(intervals, means)):
+                    break
+
+                count = 2 * count
+                edges = np.linspace(0, total, count + 1).astype(int)
+                sampled = np.sort(indices)
+                for low, high in zip(edges[:-1], edges[1:]):
+                    if low < high and np.searchsorted(sampled, low) == np.searchsorted(sampled, high):
+                        indices.append(int(rng.integers(low, high)))
+                        values.append(read_frame(indices[-1]))
+
+        return (means[0], intervals[0]), (means[1], intervals[1]), len(values)
+
+    @staticmethod
+    def compare_audio_approximate(file_1: str, file_2: str, error_bound: float = 0.01,
+                                  confidence: float = 0.95, seed: int | None = None) \
+        -> Tuple[float, float]:
+        """
+        Compares two audio files like compare_audio, estimating the spectral properties from sampled frames.
+
+        Args:
+            file_1 (str): The path to the first audio file.
+            file_2 (str): The path to the second audio file.
+            error_bound (float): The wanted relative half-width of the confidence intervals.
+            confidence (float): The confidence level of the intervals.
+            seed (int, optional): The seed of the random frame choice.
+
+        Returns:
+            Tuple[float, float]: The percentage difference in spectral centroid and mean spectral flatness.
+        """
+
+        (centroid_1, _), (mean_1, _), _ = SoundComparison.estimate_spectral_properties(file_1, error_bound, 
+                                                                                        confidence, seed=seed)
+        (centroid_2, _), (mean_2, _), _ = SoundComparison.estimate_spectral_properties(file_2, error_bound, 
+                                                                                        confidence, seed=seed)
+        return SoundComparison.get_difference(centroid_1, mean_1, centroid_2, mean_2)
@@ -10,7 +10,8 @@ import scipy as sp
 from scipy import signal
 
 # Other imports
-from typing import Callable, Any
+import functools
+from typing import Callable, Any, List, Tuple
 
 
 class SoundEnhansement:
@@ -34,7 +35,8 @@ class SoundEnhansement:
             Callable[[int, np.ndarray], np.ndarray]: A resulting wrapper function.
         """
 
-        def wrapper(samplerate: int, data: np.ndarray):
+        @functools.wraps(process_channel)
+        def wrapper(samplerate: int, data: np.ndarray, **kwargs):
             try:
                 channels = data.shape[1]
             except IndexError:
@@ -43,21 +45,71 @@ class SoundEnhansement:
 
             # For Stereo Audio
             if channels == 2:
-                filtered_data = np.transpose([process_channel(samplerate, ch) for ch in np.transpose(data)])
+                filtered_data = np.transpose([process_channel(samplerate, ch, **kwargs) for ch in np.transpose(data)])
 
             # For Mono Audio
             else:
-                filtered_data = process_channel(samplerate, data)
+                filtered_data = process_channel(samplerate, data, **kwargs)
 
             return filtered_data
         return wrapper
 
+    @staticmethod
+    def get_method(name: str) \
+        -> Callable[[int, np.ndarray], np.ndarray]:
+        """
+        Returns the enhansement method with the given name.
+
+        Args:
+            name (str): The method name, 'wiener' or 'lib_wiener'.
+
+        Raises:
+            ValueError: If there is no method with such name.
+
+        Returns:
+            Callable[[int, np.ndarray], np.ndarray]: The method that takes a samplerate and audio data.
+        """
+
+        methods = {
+            "wiener": SoundEnhansement.wiener,
+            "lib_wiener": SoundEnhansement.lib_wiener,
+        }
+        if name not in methods:
+            raise ValueError(f"Unknown enhansement method: {name}")
+        return methods[name]
+
     @staticmethod
     @audio_decorator
-    def wiener(samplerate: int, data: np.ndarray):
+    def wiener(samplerate: int, data: np.ndarray, psd_tolerance: float | None = None, stats: dict | None = None):
         """
         Applies the custom Wiener filter to the given data.
 
+        Args:
+            data (np.ndarray): The input data to be filtered.
+            psd_tolerance (float, optional): Stop the Welch PSD estimate once it changes less than
+                that between updates. Defaults to None, which averages all segments.
+            stats (dict, optional): If given, the number of Welch segments used for every channel
+                is appended to its 'psd_segments' list.
+
+        Returns:
+            np.ndarray: The filtered data.
+        """
+
+        normalized = data / np.max(np.abs(data))
+        fs, psd, segments = SoundEnhansement.welch_psd(samplerate, normalized, psd_tolerance)
+        if stats is not None:
+            stats.setdefault("psd_segments", []).append(segments)
+        taps = SoundEnhansement.wiener_taps(fs, psd)
+
+        filtered_audio_data = np.convolve(normalized, taps)
+        return filtered_audio_data[:len(data)]
+
+    @staticmethod
+    @audio_decorator
+    def lib_wiener(samplerate, data: np.ndarray):
+        """
+        Applies the SciPy Lib Wiener filter to the given data.
+
         Args:
             data (np.ndarray): The input data to be filtered.
 
@@ -65,6 +117,94 @@ class SoundEnhansement:
             np.ndarray: The filtered data.
         """
 
+        wiener_n = 1024
+
+        R = np.correlate(data, data, mode='full')
+        R = R[R.size//2 - wiener_n + 1:R.size//2 + wiener_n]
+        P = sp.signal.correlate(data, data, mode='full')
+        P = P[P.size//2:P.size//2+wiener_n]
+
+        h = SoundEnhansement.lib_wiener_taps(R, P)
+
+        return signal.lfilter(h, 1.0, data)
+
+    @staticmethod
+    def welch_psd(samplerate: int, data: np.ndarray, tolerance: float | None = None, 
+                  check_segments: int = 64, nperseg: int = 256, noverlap: int = 128) \
+        -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Estimates the Welch PSD, optionally stopping once the estimate has converged.
+
+        With a tolerance the segments are averaged in batches, and the estimate stops
+        when a batch changes it by less than the tolerance, relative to its L1 norm.
+        For a stationary noise floor that happens long before the end of a long file.
+
+        Args:
+            samplerate (int): The samplerate of the data.
+            data (np.ndarray): The samples of a single channel.
+            tolerance (float, optional): The relative change that stops the estimate.
+                Defaults to None, which averages all segments like signal.welch.
+            check_segments (int): The number of segments between convergence checks.
+            nperseg (int): The length of each segment, data shorter than that is a single segment.
+            noverlap (int): The number of samples to overlap between segments.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, int]: The frequencies, the PSD and the number of segments used.
+        """
+
+        # Shorter data is a single segment, the same as signal.welch makes it by default
+        if len(data) < nperseg:
+            nperseg, noverlap = len(data), len(data) // 2
+        step = nperseg - noverlap
+        total = (len(data) - noverlap) // step
+        if tolerance is None:
+            fs, psd = signal.welch(data, fs=samplerate, nperseg=nperseg, noverlap=noverlap)
+            return fs, psd, total
+
+        psd_sum, segments = 0, 0
+        for start in range(0, total, check_segments):
+            count = min(check_segments, total - start)
+            fs, _, segments_psd = signal.spectrogram(data[start * step:(start + count) * step + noverlap],
+                                                     fs=samplerate, window='hann', nperseg=nperseg,
+                                                     noverlap=noverlap, detrend='constant',
+                                                     scaling='density', mode='psd')
+            previous = psd_sum / segments if segments else None
+            psd_sum, segments = psd_sum + np.sum(segments_psd, axis=-1), segments + count
+            if previous is not None and SoundEnhansement.psd_converged(previous, psd_sum / segments, tolerance):
+                break
+        return fs, psd_sum / segments, segments
+
+    @staticmethod
+    def psd_converged(previous: np.ndarray, current: np.ndarray, tolerance: float) \
+        -> bool:
+        """
+        Checks whether the PSD estimate changed by less than the tolerance, relative to its L1 norm.
+
+        Args:
+            previous (np.ndarray): The previous estimate.
+            current (np.ndarray): The current estimate.
+            tolerance (float): The relative tolerance.
+
+        Returns:
+            bool: Whether the estimate has converged.
+        """
+
+        return np.sum(np.abs(current - previous)) <= tolerance * np.sum(np.abs(current))
+
+    @staticmethod
+    def wiener_taps(fs: np.ndarray, psd: np.ndarray) \
+        -> np.ndarray:
+        """
+        Designs the custom Wiener filter from the PSD of the normalized signal.
+
+        Args:
+            fs (np.ndarray): The frequencies of the PSD, as returned by signal.welch.
+            psd (np.ndarray): The PSD of the normalized signal.
+
+        Returns:
+            np.ndarray: The filter taps.
+        """
+
         def wiener_filter(psd, noise_pds, N):
             H = psd / (psd + noise_pds)
             taps = np.fft.irfft(H, n=N)
@@ -78,37 +218,160 @@ class SoundEnhansement:
             psd_noise = np.abs(psd_noise_1 - psd_noise_2) ** 1.5
             return psd_noise
 
-        normalized = data / np.max(np.abs(data))
-        fs, psd = signal.welch(normalized, fs=samplerate)
-
         N = len(psd)
         psd_noise = get_noise_psd(psd, fs, N)
-        taps = wiener_filter(psd, psd_noise, N)
+        return wiener_filter(psd, psd_noise, N)
 
-        filtered_audio_data = np.convolve(normalized, taps)
-        return filtered_audio_data[:len(data)]
+    @staticmethod
+    def lib_wiener_taps(R: np.ndarray, P: np.ndarray) \
+        -> np.ndarray:
+        """
+        Designs the SciPy Lib Wiener filter from the signal autocorrelation.
+
+        Args:
+            R (np.ndarray): The autocorrelation at lags from -(n - 1) to n - 1.
+            P (np.ndarray): The autocorrelation at lags from 0 to n - 1.
+
+        Returns:
+            np.ndarray: The filter taps, n of them.
+        """
+
+        wiener_n = len(P)
+        R_matrix = np.array([R[i:i+wiener_n] for i in range(wiener_n)])
+        h, _, _, _ = np.linalg.lstsq(R_matrix, P, rcond=None)
+        return h
 
     @staticmethod
-    @audio_decorator
-    def lib_wiener(samplerate, data: np.ndarray):
+    def wiener_batch(samplerate: int, clips: List[np.ndarray], batch_size: int = 64) \
+        -> List[np.ndarray]:
         """
-        Applies the SciPy Lib Wiener filter to the given data.
+        Applies the custom Wiener filter to many clips at once.
+
+        The clips are stacked into a zero-padded 2-D array, so the Welch PSD, the filter
+        design and the convolution run as vectorized operations over the whole batch.
+        Only Welch segments that lie fully inside a clip are averaged, so the padding
+        does not leak into the PSD estimate.
 
         Args:
-            data (np.ndarray): The input data to be filtered.
+            samplerate (int): The samplerate shared by all clips.
+            clips (List[np.ndarray]): The mono or stereo clips to be filtered.
+            batch_size (int): The number of clips stacked into one array.
 
         Returns:
-            np.ndarray: The filtered data.
+            List[np.ndarray]: The filtered clips, unpadded, in the input order.
+        """
+
+        nperseg, noverlap = 256, 128
+
+        def process_rows(rows, lengths):
+            normalized = rows / np.max(np.abs(rows), axis=1, keepdims=True)
+            fs, _, segments_psd = signal.spectrogram(normalized, fs=samplerate, window='hann',
+                                                     nperseg=nperseg, noverlap=noverlap,
+                                                     detrend='constant', scaling='density', mode='psd')
+
+            # Average only the segments that do not overlap the padding
+            counts = (lengths - noverlap) // (nperseg - noverlap)
+            mask = np.arange(segments_psd.shape[-1]) < counts[:, np.newaxis]
+            psd = np.sum(segments_psd * mask[:, np.newaxis, :], axis=-1) / counts[:, np.newaxis]
+
+            N = psd.shape[1]
+            coef = 2 * np.pi * fs * np.arange(N) / N
+            psd_noise = np.abs(psd @ np.sin(coef) - psd @ np.cos(coef)) ** 1.5
+            H = psd / (psd + psd_noise[:, np.newaxis])
+            taps = np.fft.irfft(H, n=N, axis=1)
+
+            return signal.fftconvolve(normalized, taps, axes=1)
+
+        def process_clip(clip):
+            return SoundEnhansement.wiener(samplerate, clip)
+
+        return SoundEnhansement.__run_batched(clips, batch_size, nperseg, process_rows, process_clip)
+
+    @staticmethod
+    def lib_wiener_batch(samplerate: int, clips: List[np.ndarray], batch_size: int = 8) \
+        -> List[np.ndarray]:
+        """
+        Applies the SciPy Lib Wiener filter to many clips at once.
+
+        The autocorrelations of the whole batch are computed with a single FFT and the
+        normal equations are solved as a stack of matrices, so no Python loop runs per clip.
+
+        Args:
+            samplerate (int): The samplerate shared by all clips.
+            clips (List[np.ndarray]): The mono or stereo clips to be filtered.
+            batch_size (int): The number of clips stacked into one array. Every clip
+                needs a 1024x1024 matrix, so keep it small.
+
+        Returns:
+            List[np.ndarray]: The filtered clips, unpadded, in the input order.
         """
 
         wiener_n = 1024
 
-        R = np.correlate(data, data, mode='full')
-        R = R[R.size//2 - wiener_n + 1:R.size//2 + wiener_n]
-        R_matrix = np.array([R[i:i+wiener_n] for i in range(wiener_n)])
-        P = sp.signal.correlate(data, data, mode='full')
-        P = P[P.size//2:P.size//2+wiener_n]
+        def process_rows(rows, lengths):
+            nfft = sp.fft.next_fast_len(rows.shape[1] + wiener_n)
+            spectrum = np.fft.rfft(rows, n=nfft, axis=1)
+            R = np.fft.irfft(np.abs(spectrum) ** 2, n=nfft, axis=1)[:, :wiener_n]
 
-        h, _, _, _ = np.linalg.lstsq(R_matrix, P, rcond=None)
+            # Same matrix layout as in lib_wiener: R_matrix[i, j] holds the lag i + j - n + 1
+            lags = np.abs(np.add.outer(np.arange(wiener_n), np.arange(wiener_n)) - wiener_n + 1)
+            R_matrix = R[:, lags]
+            P = R[:, :, np.newaxis]
 
-        return signal.lfilter(h, 1.0, data)
+            rcond = np.finfo(np.float64).eps * wiener_n
+            h = (np.linalg.pinv(R_matrix, rcond=rcond, hermitian=True) @ P)[:, :, 0]
+
+            return signal.fftconvolve(rows, h, axes=1)
+
+        def process_clip(clip):
+            return SoundEnhansement.lib_wiener(samplerate, clip)
+
+        return SoundEnhansement.__run_batched(clips, batch_size, wiener_n, process_rows, process_clip)
+
+    @staticmethod
+    def __run_batched(clips: List[np.ndarray], batch_size: int, min_length: int,
+                      process_rows: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                      process_clip: Callable[[np.ndarray], np.ndarray]) \
+        -> List[np.ndarray]:
+        """
+        Stacks the channels of the clips into padded 2-D arrays, processes them
+        and splits the result back into clips.
+
+        Args:
+            clips (List[np.ndarray]): The mono or stereo clips to be processed.
+            batch_size (int): The number of clips stacked into one array.
+            min_length (int): Clips shorter than that are processed one by one with process_clip.
+            process_rows (Callable[[np.ndarray, np.ndarray], np.ndarray]): A function that takes 
+                the padded rows and their lengths, and returns the processed rows.
+            process_clip (Callable[[np.ndarray], np.ndarray]): A fallback for a single clip.
+
+        Returns:
+            List[np.ndarray]: The processed clips, unpadded, in the input order.
+        """
+
+        results: List[np.ndarray | None] = [None] * len(clips)
+        batched = [i for i, clip in enumerate(clips) if clip.shape[0] >= min_length]
+        for i in sorted(set(range(len(clips))) - set(batched)):
+            results[i] = process_clip(clips[i])
+
+        for start in range(0, len(batched), batch_size):
+            indices = batched[start:start + batch_size]
+            channels = [np.transpose(clips[i]) if clips[i].ndim == 2 else clips[i][np.newaxis] 
+                        for i in indices]
+            lengths = np.concatenate([[channel.shape[1]] * channel.shape[0] for channel in channels])
+
+            rows = np.zeros((len(lengths), np.max(lengths)))
+            row = 0
+            for channel in channels:
+                rows[row:row + channel.shape[0], :channel.shape[1]] = channel
+                row += channel.shape[0]
+
+            processed = process_rows(rows, lengths)
+
+            row = 0
+            for i, channel in zip(indices, channels):
+                clip = processed[row:row + channel.shape[0], :channel.shape[1]]
+                results[i] = np.transpose(clip) if clips[i].ndim == 2 else clip[0]
+                row += channel.shape[0]
+
+        return results
@@ -0,0 +1,324 @@
+"""
+This is the sound_io module. It provides SoundIO class
+to read and write WAV, FLAC and OGG audio, in whole or block by block,
+and raw PCM streams.
+"""
+
+
+import numpy as np
+import soundfile as sf
+from scipy.io import wavfile
+
+import os
+import struct
+
+from typing import BinaryIO, Callable, Iterator, Tuple
+
+from sound_tools.sound_streaming import StreamingEnhansement
+
+
+class SoundIO:
+    """
+    Class that reads and writes audio files in the formats supported by libsndfile.
+
+    Compressed files are decoded block by block, so they can be processed without
+    converting them to WAV first.
+    """
+
+    # File dialog filter with all supported formats
+    filetypes: list = [("Audio File", "*.wav *.flac *.ogg"), ("WAV", "*.wav"), ("FLAC", "*.flac"), ("OGG", "*.ogg")]
+
+    # The integer dtypes the PCM subtypes are read into, the rest is read as float32
+    subtype_dtypes: dict = {"PCM_16": "int16", "PCM_24": "int32", "PCM_32": "int32"}
+
+    # The dtypes scipy reads the WAV subtypes into
+    wav_dtypes: dict = {"PCM_U8": "uint8", "PCM_16": "int16", "PCM_24": "int32", "PCM_32": "int32",
+                        "FLOAT": "float32", "DOUBLE": "float64"}
+
+    # Raw PCM formats with their sample width in bytes and full scale, floats have none
+    pcm_formats: dict = {"s16le": (2, 2 ** 15), "s24le": (3, 2 ** 23), "s32le": (4, 2 ** 31),
+                         "f32le": (4, None), "f64le": (8, None)}
+
+    @staticmethod
+    def info(filepath: str) \
+        -> Tuple[int, int, int]:
+        """
+        Returns the samplerate, the number of frames and the number of channels of the file.
+
+        Args:
+            filepath (str): The path to the audio file.
+
+        Returns:
+            Tuple[int, int, int]: The samplerate, frames and channels.
+        """
+
+        info = sf.info(filepath)
+        return info.samplerate, info.frames, info.channels
+
+    @staticmethod
+    def read_dtype(filepath: str) \
+        -> np.dtype:
+        """
+        Returns the dtype read returns the file in, without decoding it.
+
+        Args:
+            filepath (str): The path to the audio file.
+
+        Returns:
+            np.dtype: The dtype of the audio data.
+        """
+
+        subtype = sf.info(filepath).subtype
+        if os.path.splitext(filepath)[1].lower() == ".wav":
+            return np.dtype(SoundIO.wav_dtypes.get(subtype, "float32"))
+        return np.dtype(SoundIO.subtype_dtypes.get(subtype, "float32"))
+
+    @staticmethod
+    def blocks(filepath: str, block_size: int = 65536, dtype: str = "float64") \
+        -> Callable[[], Iterator[np.ndarray]]:
+        """
+        Creates a block factory that decodes the file block by block.
+
+        Args:
+            filepath (str): The path to the audio file.
+            block_size (int): The number of frames in each block.
+            dtype (str): The dtype of the blocks. Float blocks are in the [-1, 1] range.
+
+        Returns:
+            Callable[[], Iterator[np.ndarray]]: The block factory, 1-D blocks for mono files
+            and (frames, channels) for the others.
+        """
+
+        def blocks():
+            yield from sf.blocks(filepath, blocksize=block_size, dtype=dtype)
+        return blocks
+
+    @staticmethod
+    def read(filepath: str, block_size: int = 65536) \
+        -> Tuple[int, np.ndarray]:
+        """
+        Reads the whole audio file.
+
+        WAV files are read with scipy, keeping their sample format. Other files are decoded
+        block by block into a preallocated array, PCM formats as integers.
+
+        Args:
+            filepath (str): The path to the audio file.
+            block_size (int): The number of frames decoded at once.
+
+        Returns:
+            Tuple[int, np.ndarray]: The samplerate and the audio data.
+        """
+
+        if os.path.splitext(filepath)[1].lower() == ".wav":
+            return wavfile.read(filepath)
+
+        info = sf.info(filepath)
+        dtype = SoundIO.subtype_dtypes.get(info.subtype, "float32")
+        shape = (info.frames,) if info.channels == 1 else (info.frames, info.channels)
+        data = np.empty(shape, dtype=dtype)
+
+        position = 0
+        for block in SoundIO.blocks(filepath, block_size, dtype)():
+            data[position:position + len(block)] = block
+            position += len(block)
+        return info.samplerate, data[:position]
+
+    @staticmethod
+    def write(filepath: str, samplerate: int, data: np.ndarray) \
+        -> int:
+        """
+        Writes the audio data in the format given by the file extension.
+
+        Float data is expected in the [-1, 1] range. WAV stores float data as it is, the
+        compressed formats cannot store values outside of the range, so they are clipped,
+        the same as enhance_file does.
+
+        Args:
+            filepath (str): The path to the audio file, '.wav', '.flac' or '.ogg'.
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The audio data.
+
+        Returns:
+            int: The number of clipped samples.
+        """
+
+        if os.path.splitext(filepath)[1].lower() in [".wav", ""]:
+            wavfile.write(filepath, samplerate, data)
+            return 0
+
+        data, clipped = SoundIO.clip(data)
+        sf.write(filepath, data, samplerate)
+        return clipped
+
+    @staticmethod
+    def clip(data: np.ndarray) \
+        -> Tuple[np.ndarray, int]:
+        """
+        Clips float data to the [-1, 1] range, integer data is returned as it is.
+
+        Args:
+            data (np.ndarray): The audio data.
+
+        Returns:
+            Tuple[np.ndarray, int]: The clipped data and the number of clipped samples.
+        """
+
+        if not np.issubdtype(data.dtype, np.floating):
+            return data, 0
+        clipped = int(np.count_nonzero(np.abs(data) > 1))
+        return (np.clip(data, -1, 1) if clipped else data), clipped
+
+    @staticmethod
+    def read_wav_header(stream: BinaryIO) \
+        -> Tuple[int, int, str]:
+        """
+        Reads the WAV header from the stream, leaving it at the start of the samples.
+
+        The size of the data chunk is ignored, so streamed WAV with an unknown length works.
+
+        Args:
+            stream (BinaryIO): The binary stream that starts with a WAV header.
+
+        Raises:
+            ValueError: If the header is malformed or the sample format is not supported.
+
+        Returns:
+            Tuple[int, int, str]: The samplerate, the number of channels and the raw PCM format.
+        """
+
+        riff = stream.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:] != b"WAVE":
+            raise ValueError("The stream is not a WAV file.")
+
+        fmt = None
+        while True:
+            chunk = stream.read(8)
+            if len(chunk) < 8:
+                raise ValueError("The WAV stream has no data chunk.")
+            chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"data":
+                break
+            body = stream.read(size + size % 2)
+            if chunk_id == b"fmt ":
+                fmt = body
+
+        if fmt is None:
+            raise ValueError("The WAV stream has no fmt chunk.")
+        tag, channels, samplerate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if tag == 0xFFFE and len(fmt) >= 26:
+            tag = struct.unpack("<H", fmt[24:26])[0]
+
+        formats = {(1, 16): "s16le", (1, 24): "s24le", (1, 32): "s32le", (3, 32): "f32le", (3, 64): "f64le"}
+        if (tag, bits) not in formats:
+            raise ValueError(f"Unsupported WAV sample format: tag {tag}, {bits} bits.")
+        return samplerate, channels, formats[(tag, bits)]
+
+    @staticmethod
+    def read_pcm_blocks(stream: BinaryIO, sample_format: str, channels: int, block_size: int = 4096) \
+        -> Iterator[np.ndarray]:
+        """
+        Reads raw PCM from the stream block by block until its end.
+
+        Args:
+            stream (BinaryIO): The binary stream, e.g. sys.stdin.buffer.
+            sample_format (str): One of the pcm_formats.
+            channels (int): The number of interleaved channels.
+            block_size (int): The number of frames in each block.
+
+        Returns:
+            Iterator[np.ndarray]: The float64 blocks in the [-1, 1] range, 1-D for mono
+            and (frames, channels) for the others. A trailing partial frame is dropped.
+        """
+
+        frame_bytes = SoundIO.pcm_formats[sample_format][0] * channels
+        while True:
+            raw = stream.read(block_size * frame_bytes)
+            if len(raw) < frame_bytes:
+                return
+            data = SoundIO.decode_pcm(raw[:len(raw) - len(raw) % frame_bytes], sample_format)
+            yield data if channels == 1 else data.reshape(-1, channels)
+
+    @staticmethod
+    def decode_pcm(raw: bytes, sample_format: str) \
+        -> np.ndarray:
+        """
+        Converts raw little-endian PCM to float64 samples in the [-1, 1] range.
+
+        Args:
+            raw (bytes): The interleaved samples.
+            sample_format (str): One of the pcm_formats.
+
+        Returns:
+            np.ndarray: The samples, still interleaved.
+        """
+
+        width, full_scale = SoundIO.pcm_formats[sample_format]
+        if full_scale is None:
+            return np.frombuffer(raw, dtype=f"<f{width}").astype(np.float64)
+        if width == 3:
+            data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            data = data[:, 0] | (data[:, 1] << 8) | (data[:, 2] << 16)
+            data = np.where(data >= 2 ** 23, data - 2 ** 24, data)
+        else:
+            data = np.frombuffer(raw, dtype=f"<i{width}")
+        return data / full_scale
+
+    @staticmethod
+    def encode_pcm(data: np.ndarray, sample_format: str) \
+        -> bytes:
+        """
+        Converts float samples in the [-1, 1] range to raw little-endian PCM.
+
+        Integer formats clip the samples outside of the range.
+
+        Args:
+            data (np.ndarray): The samples, (frames, channels) are interleaved.
+            sample_format (str): One of the pcm_formats.
+
+        Returns:
+            bytes: The raw PCM.
+        """
+
+        width, full_scale = SoundIO.pcm_formats[sample_format]
+        if full_scale is None:
+            return np.ascontiguousarray(data, dtype=f"<f{width}").tobytes()
+
+        samples = np.clip(np.round(np.ravel(data) * full_scale), -full_scale, full_scale - 1).astype("<i4")
+        if width == 3:
+            return samples.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+        return samples.astype(f"<i{width}").tobytes()
+
+    @staticmethod
+    def enhance_file(method: str, input_path: str, output_path: str, block_size: int = 65536, **params) \
+        -> int:
+        """
+        Applies the enhansement method to the file block by block and writes the result
+        block by block, so neither the input nor the output is held in memory.
+
+        WAV output is written as float, the compressed formats are clipped to the [-1, 1]
+        range, the same as write does.
+
+        Args:
+            method (str): The method name, 'wiener' or 'lib_wiener'.
+            input_path (str): The path to the input audio file.
+            output_path (str): The path to the output audio file, its extension gives the format.
+            block_size (int): The number of frames in each block.
+            params: Keyword parameters of the method, e.g. psd_tolerance for 'wiener'.
+
+        Returns:
+            int: The number of clipped samples.
+        """
+
+        samplerate, _, channels = SoundIO.info(input_path)
+        blocks = SoundIO.blocks(input_path, block_size)
+        is_wav = os.path.splitext(output_path)[1].lower() == ".wav"
+
+        clipped = 0
+        with sf.SoundFile(output_path, 'w', samplerate, channels, "FLOAT" if is_wav else None) as output:
+            for block in StreamingEnhansement.get_method(method)(samplerate, blocks, **params):
+                if not is_wav:
+                    block, block_clipped = SoundIO.clip(block)
+                    clipped += block_clipped
+                output.write(block)
+        return clipped
@@ -0,0 +1,209 @@
+"""
+This is the sound_pipeline module. It provides ProcessingPipeline class
+to chain processing stages and reuse the results of the unchanged ones.
+"""
+
+
+import numpy as np
+
+import re
+import json
+import inspect
+import hashlib
+import functools
+from collections import OrderedDict
+
+from typing import Callable, List, Tuple
+
+from sound_tools.sound_enhansement import SoundEnhansement
+from sound_tools.sound_cache import SoundCache
+from sound_tools.sound_activity import SoundActivity
+
+
+class ProcessingPipeline:
+    """
+    Runs chains of processing stages and memoizes the output of every stage.
+
+    The output of a stage is keyed by the hash of its input and of the names and
+    parameters of all stages up to it, so changing a late stage reuses all earlier results.
+    """
+
+    def __init__(self, memo_size: int = 8) \
+        -> None:
+        """
+        Initializes the pipeline with an empty memo.
+
+        Args:
+            memo_size (int): The number of stage outputs kept in memory.
+
+        Returns:
+            None
+        """
+
+        self.memo_size = memo_size
+        self.memo: OrderedDict = OrderedDict()
+        return
+
+    @staticmethod
+    def normalize(samplerate: int, data: np.ndarray, peak: float = 1.0) \
+        -> np.ndarray:
+        """
+        Scales the data so its absolute maximum equals the peak.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The audio data.
+            peak (float): The resulting absolute maximum.
+
+        Returns:
+            np.ndarray: The normalized data.
+        """
+
+        return data / np.max(np.abs(data)) * peak
+
+    @staticmethod
+    def output_level(samplerate: int, data: np.ndarray, level: float = -1.0) \
+        -> np.ndarray:
+        """
+        Scales the data so its peak is at the given level relative to full scale.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The audio data.
+            level (float): The peak level in dBFS.
+
+        Returns:
+            np.ndarray: The scaled data in the [-1, 1] range.
+        """
+
+        return ProcessingPipeline.normalize(samplerate, data, 10 ** (level / 20))
+
+    @staticmethod
+    def get_stage(name: str) \
+        -> Callable[..., np.ndarray]:
+        """
+        Returns the stage with the given name.
+
+        Args:
+            name (str): The stage name: 'normalize', 'wiener', 'lib_wiener', their silence-aware
+                versions 'sparse_wiener' and 'sparse_lib_wiener', or 'output_level'.
+
+        Raises:
+            ValueError: If there is no stage with such name.
+
+        Returns:
+            Callable[..., np.ndarray]: The stage that takes a samplerate, audio data and its parameters.
+        """
+
+        def filtered_only(method):
+            # Keeps the signature of the method, so parse can check the parameters
+            @functools.wraps(method)
+            def stage(samplerate, data, **params):
+                return method(samplerate, data, **params)[0]
+            return stage
+
+        stages = {
+            "normalize": ProcessingPipeline.normalize,
+            "wiener": SoundEnhansement.wiener,
+            "lib_wiener": SoundEnhansement.lib_wiener,
+            "sparse_wiener": filtered_only(SoundActivity.wiener),
+            "sparse_lib_wiener": filtered_only(SoundActivity.lib_wiener),
+            "output_level": ProcessingPipeline.output_level,
+        }
+        if name not in stages:
+            raise ValueError(f"Unknown processing stage: {name}")
+        return stages[name]
+
+    @staticmethod
+    def parse(description: str) \
+        -> List[Tuple[str, dict]]:
+        """
+        Parses a chain description such as 'normalize > wiener > output_level(level=-3)'.
+
+        Args:
+            description (str): The stages separated by '>' or '→', each with optional
+                parameters in parentheses.
+
+        Raises:
+            ValueError: If the description is malformed, names an unknown stage
+                or a parameter the stage does not take.
+
+        Returns:
+            List[Tuple[str, dict]]: The stage names and parameters.
+        """
+
+        stages = []
+        for part in re.split(r"\s*(?:>|→)\s*", description.strip()):
+            match = re.fullmatch(r"(\w+)\s*(?:\((.*)\))?", part)
+            if match is None:
+                raise ValueError(f"Invalid processing stage: {part}")
+
+            name, arguments = match.group(1), match.group(2)
+            stage = ProcessingPipeline.get_stage(name)
+            params = {}
+            for argument in filter(None, re.split(r"\s*,\s*", (arguments or "").strip())):
+                key, _, value = argument.partition("=")
+                try:
+                    params[key.strip()] = json.loads(value)
+                except json.JSONDecodeError:
+                    params[key.strip()] = value.strip()
+
+            try:
+                if "stats" in params:
+                    raise TypeError("stats are collected by run")
+                inspect.signature(stage).bind(None, None, **params)
+            except TypeError as e:
+                raise ValueError(f"Invalid parameters of processing stage {name}: {e}")
+            stages.append((name, params))
+        return stages
+
+    def run(self, samplerate: int, data: np.ndarray, stages: List[Tuple[str, dict]],
+            stats: dict | None = None) \
+        -> Tuple[np.ndarray, int]:
+        """
+        Runs the chain of stages, computing only those whose output is not memoized.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The input audio data.
+            stages (List[Tuple[str, dict]]): The stage names and parameters.
+            stats (dict, optional): If given, the lists the stages with a stats parameter report,
+                e.g. 'skipped_fraction' or 'psd_segments', are extended in it. The stats are
+                memoized with the outputs, so they are reported for the reused stages as well.
+
+        Returns:
+            Tuple[np.ndarray, int]: The output of the last stage and the number of stages computed.
+        """
+
+        key = SoundCache.make_key(samplerate, data, "input")
+        output, computed = data, 0
+        for name, params in stages:
+            key = hashlib.sha256(f"{key}|{name}|{json.dumps(params, sort_keys=True)}".encode()).hexdigest()
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                output, stage_stats = self.memo[key]
+            else:
+                stage = ProcessingPipeline.get_stage(name)
+                stage_stats = {}
+                if "stats" in inspect.signature(stage).parameters:
+                    output = stage(samplerate, output, **params, stats=stage_stats)
+                else:
+                    output = stage(samplerate, output, **params)
+                computed += 1
+                self.memo[key] = output, stage_stats
+                if len(self.memo) > self.memo_size:
+                    self.memo.popitem(last=False)
+
+            if stats is not None:
+                for stat, values in stage_stats.items():
+                    stats.setdefault(stat, []).extend(values)
+        return output, computed
+
+    def clear(self) \
+        -> None:
+        """
+        Forgets all memoized outputs.
+        """
+
+        self.memo.clear()
+        return
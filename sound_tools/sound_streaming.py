@@ -0,0 +1,507 @@
+"""
+This is the sound_streaming module. It provides StreamingEnhansement class
+to apply the enhansement methods block by block with bounded memory.
+"""
+
+
+# Math imports
+import numpy as np
+from scipy import signal
+
+# Other imports
+from typing import Callable, Iterable, Iterator, Tuple
+
+from sound_tools.sound_enhansement import SoundEnhansement
+
+
+class WelchAccumulator:
+    """
+    Accumulates the Welch PSD estimate of a signal that arrives in blocks.
+
+    The segments are taken at the same offsets as signal.welch takes them from the
+    whole signal, so after the last block the estimate equals signal.welch.
+
+    With a tolerance the estimate is checked every check_segments segments and stops
+    taking new ones once it has converged, see SoundEnhansement.welch_psd.
+    """
+
+    def __init__(self, samplerate: int, nperseg: int = 256, noverlap: int = 128,
+                 tolerance: float | None = None, check_segments: int = 64) \
+        -> None:
+        """
+        Initializes an empty estimate.
+
+        Args:
+            samplerate (int): The samplerate of the signal.
+            nperseg (int): The length of each segment.
+            noverlap (int): The number of samples to overlap between segments.
+            tolerance (float, optional): The relative change that stops the estimate.
+                Defaults to None, which takes all segments.
+            check_segments (int): The number of segments between convergence checks.
+
+        Returns:
+            None
+        """
+
+        self.samplerate = samplerate
+        self.nperseg = nperseg
+        self.noverlap = noverlap
+        self.tolerance = tolerance
+        self.check_segments = check_segments
+        self.converged = False
+        self.checked = None
+        self.segments = 0
+        self.freqs = np.fft.rfftfreq(nperseg, 1 / samplerate)
+        self.total = np.zeros(len(self.freqs))
+        self.tail = np.zeros(0)
+        return
+
+    @property
+    def psd(self) \
+        -> np.ndarray:
+        """
+        The current PSD estimate.
+        """
+
+        return self.total / max(self.segments, 1)
+
+    def update(self, block: np.ndarray) \
+        -> None:
+        """
+        Adds all complete segments of the block to the estimate, unless it has converged.
+
+        Args:
+            block (np.ndarray): The next samples of a single channel.
+
+        Returns:
+            None
+        """
+
+        if self.converged:
+            return
+        buffer = np.concatenate([self.tail, block])
+        step = self.nperseg - self.noverlap
+        count = (len(buffer) - self.noverlap) // step if len(buffer) >= self.nperseg else 0
+        if self.tolerance is None:
+            self.__add(buffer, count)
+            self.tail = buffer[count * step:]
+            return
+
+        # Add the segments up to every check point and compare the estimates there
+        start = 0
+        while start < count and not self.converged:
+            batch = min(self.check_segments - self.segments % self.check_segments, count - start)
+            self.__add(buffer[start * step:], batch)
+            start += batch
+            if self.segments % self.check_segments == 0:
+                if self.checked is not None:
+                    self.converged = SoundEnhansement.psd_converged(self.checked, self.psd, self.tolerance)
+                self.checked = self.psd
+        self.tail = buffer[start * step:]
+        return
+
+    def __add(self, buffer: np.ndarray, count: int) \
+        -> None:
+        """
+        Adds the first count segments of the buffer to the estimate.
+        """
+
+        if count <= 0:
+            return
+        step = self.nperseg - self.noverlap
+        _, _, segments_psd = signal.spectrogram(buffer[:count * step + self.noverlap], fs=self.samplerate,
+                                                window='hann', nperseg=self.nperseg, noverlap=self.noverlap,
+                                                detrend='constant', scaling='density', mode='psd')
+        self.total += np.sum(segments_psd, axis=-1)
+        self.segments += count
+        return
+
+    def break_stream(self) \
+        -> None:
+        """
+        Drops the samples kept from the previous block, so the next block starts a separate
+        part of the signal and no segment spans both.
+        """
+
+        self.tail = np.zeros(0)
+        return
+
+
+class AutocorrelationAccumulator:
+    """
+    Accumulates the autocorrelation of a signal that arrives in blocks, for a fixed number of lags.
+    """
+
+    def __init__(self, lags: int) \
+        -> None:
+        """
+        Initializes an empty estimate.
+
+        Args:
+            lags (int): The number of lags, starting from 0.
+
+        Returns:
+            None
+        """
+
+        self.lags = lags
+        self.acf = np.zeros(lags)
+        self.tail = np.zeros(0)
+        return
+
+    def update(self, block: np.ndarray) \
+        -> None:
+        """
+        Adds the products of the block samples with the current and previous samples.
+
+        Args:
+            block (np.ndarray): The next samples of a single channel.
+
+        Returns:
+            None
+        """
+
+        if len(block) == 0:
+            return
+        buffer = np.concatenate([self.tail, block])
+        start = len(self.tail)
+
+        # correlation[len(block) - 1 + start - k] is the sum of block[n] * buffer[start + n - k]
+        correlation = signal.correlate(buffer, block, mode='full')
+        lags = np.arange(self.lags)
+        index = len(block) - 1 + start - lags
+        valid = index >= 0
+        self.acf[valid] += correlation[index[valid]]
+
+        self.tail = buffer[-(self.lags - 1):] if self.lags > 1 else np.zeros(0)
+        return
+
+    def break_stream(self) \
+        -> None:
+        """
+        Drops the samples kept from the previous block, so the next block starts a separate
+        part of the signal and no products span both.
+        """
+
+        self.tail = np.zeros(0)
+        return
+
+
+class StreamingFilter:
+    """
+    FIR filter that is applied block by block with overlap-add, carrying its state
+    across blocks, so the output equals filtering the whole signal at once.
+    """
+
+    def __init__(self, taps: np.ndarray) \
+        -> None:
+        """
+        Initializes the filter.
+
+        Args:
+            taps (np.ndarray): The filter taps.
+
+        Returns:
+            None
+        """
+
+        self.taps = taps
+        self.state = np.zeros(len(taps) - 1)
+        return
+
+    def process(self, block: np.ndarray) \
+        -> np.ndarray:
+        """
+        Filters the next block.
+
+        Args:
+            block (np.ndarray): The next samples of a single channel.
+
+        Returns:
+            np.ndarray: The filtered samples, as many as in the block.
+        """
+
+        if len(block) == 0:
+            return np.zeros(0)
+        filtered = signal.fftconvolve(block, self.taps)
+        filtered[:len(self.state)] += self.state
+        self.state = filtered[len(block):]
+        return filtered[:len(block)]
+
+
+class StreamingEnhansement:
+    """
+    Class that applies the enhansement methods to audio that is read block by block.
+
+    The blocks are given by a factory that returns a fresh iterable of blocks every
+    time it is called, since the filters are designed in a first pass over the signal
+    and applied in a second one. The blocks are 1-D for mono audio, or (frames, channels).
+    """
+
+    @staticmethod
+    def get_method(name: str) \
+        -> Callable[[int, Callable[[], Iterable[np.ndarray]]], Iterator[np.ndarray]]:
+        """
+        Returns the streaming version of the enhansement method with the given name.
+
+        Args:
+            name (str): The method name, 'wiener' or 'lib_wiener'.
+
+        Raises:
+            ValueError: If there is no method with such name.
+
+        Returns:
+            Callable: The method that takes a samplerate and a block factory.
+        """
+
+        methods = {
+            "wiener": StreamingEnhansement.wiener,
+            "lib_wiener": StreamingEnhansement.lib_wiener,
+        }
+        if name not in methods:
+            raise ValueError(f"Unknown enhansement method: {name}")
+        return methods[name]
+
+    @staticmethod
+    def chunk(data: np.ndarray, chunk_size: int) \
+        -> Callable[[], Iterator[np.ndarray]]:
+        """
+        Creates a block factory over an in-memory array.
+
+        Args:
+            data (np.ndarray): The audio data.
+            chunk_size (int): The number of frames in each block.
+
+        Returns:
+            Callable[[], Iterator[np.ndarray]]: The block factory.
+        """
+
+        def blocks():
+            for start in range(0, len(data), chunk_size):
+                yield data[start:start + chunk_size]
+        return blocks
+
+    @staticmethod
+    def process_array(method: str, samplerate: int, data: np.ndarray, chunk_size: int, **params) \
+        -> np.ndarray:
+        """
+        Applies the streaming method to an in-memory array, chunk by chunk.
+
+        Args:
+            method (str): The method name, 'wiener' or 'lib_wiener'.
+            samplerate (int): The samplerate of the audio data.
+            data (np.ndarray): The audio data.
+            chunk_size (int): The number of frames in each chunk.
+            params: Keyword parameters of the method.
+
+        Returns:
+            np.ndarray: The filtered data, the same as the in-memory method returns.
+        """
+
+        filtered_data = np.empty(data.shape)
+        position = 0
+        blocks = StreamingEnhansement.chunk(data, chunk_size)
+        for block in StreamingEnhansement.get_method(method)(samplerate, blocks, **params):
+            filtered_data[position:position + len(block)] = block
+            position += len(block)
+        return filtered_data
+
+    @staticmethod
+    def wiener(samplerate: int, blocks: Callable[[], Iterable[np.ndarray]],
+               psd_tolerance: float | None = None, stats: dict | None = None) \
+        -> Iterator[np.ndarray]:
+        """
+        Applies the custom Wiener filter to the audio blocks.
+
+        Welch PSD of a scaled signal is the PSD of the signal scaled by the square, so the
+        peak and the PSD are collected in the same pass, and the filter is designed as
+        SoundEnhansement.wiener designs it from the normalized signal. Once the PSD has
+        converged, the rest of the first pass only looks for the peak.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            blocks (Callable[[], Iterable[np.ndarray]]): The block factory.
+            psd_tolerance (float, optional): Stop the Welch PSD estimate once it changes less than
+                that between updates. Defaults to None, which averages all segments.
+            stats (dict, optional): If given, the number of Welch segments used for every channel
+                is appended to its 'psd_segments' list.
+
+        Returns:
+            Iterator[np.ndarray]: The filtered blocks.
+        """
+
+        peaks, estimates = None, None
+        for block in StreamingEnhansement.__channels(blocks()):
+            if estimates is None:
+                peaks = np.zeros(len(block))
+                estimates = [WelchAccumulator(samplerate, tolerance=psd_tolerance) for _ in block]
+            for i, channel in enumerate(block):
+                peaks[i] = max(peaks[i], np.max(np.abs(channel), initial=0))
+                estimates[i].update(channel)
+
+        if estimates is None:
+            return
+        if stats is not None:
+            stats.setdefault("psd_segments", []).extend(estimate.segments for estimate in estimates)
+        filters = [StreamingFilter(SoundEnhansement.wiener_taps(estimate.freqs, estimate.psd / peak ** 2))
+                   for estimate, peak in zip(estimates, peaks)]
+        yield from StreamingEnhansement.__filter(blocks, filters, peaks)
+
+    @staticmethod
+    def lib_wiener(samplerate: int, blocks: Callable[[], Iterable[np.ndarray]]) \
+        -> Iterator[np.ndarray]:
+        """
+        Applies the SciPy Lib Wiener filter to the audio blocks.
+
+        Args:
+            samplerate (int): The samplerate of the audio data.
+            blocks (Callable[[], Iterable[np.ndarray]]): The block factory.
+
+        Returns:
+            Iterator[np.ndarray]: The filtered blocks.
+        """
+
+        wiener_n = 1024
+
+        estimates = None
+        for block in StreamingEnhansement.__channels(blocks()):
+            if estimates is None:
+                estimates = [AutocorrelationAccumulator(wiener_n) for _ in block]
+            for estimate, channel in zip(estimates, block):
+                estimate.update(channel)
+
+        if estimates is None:
+            return
+        filters = [StreamingFilter(StreamingEnhansement.__lib_wiener_taps(estimate.acf)) for estimate in estimates]
+        yield from StreamingEnhansement.__filter(blocks, filters, np.ones(len(filters)))
+
+    @staticmethod
+    def single_pass(method: str, samplerate: int, blocks: Iterable[np.ndarray], warmup: int,
+                    psd_tolerance: float | None = None, stats: dict | None = None) \
+        -> Iterator[np.ndarray]:
+        """
+        Applies the enhansement method to blocks that can be read only once, e.g. from a pipe.
+
+        The filters are designed from the first warmup frames, or from fewer if the 'wiener'
+        PSD estimate converges earlier. Those frames are buffered and filtered once the filters
+        are ready, the rest is filtered block by block, so the memory is bounded by the warmup.
+        The 'wiener' output is scaled by the peak of the warmup instead of the whole signal.
+        A warmup shorter than a Welch segment is a single segment, and the channels the
+        filters cannot be designed for, e.g. silent ones, are passed through unchanged.
+
+        Args:
+            method (str): The method name, 'wiener' or 'lib_wiener'.
+            samplerate (int): The samplerate of the audio data.
+            blocks (Iterable[np.ndarray]): The blocks, 1-D for mono audio, or (frames, channels).
+            warmup (int): The maximal number of frames the filters are designed from.
+            psd_tolerance (float, optional): Stop the 'wiener' warmup once the PSD estimate changes
+                less than that between updates. Defaults to None, which uses the whole warmup.
+            stats (dict, optional): If given, the number of warmup frames is stored in its
+                'warmup_frames' key.
+
+        Raises:
+            ValueError: If there is no method with such name.
+
+        Returns:
+            Iterator[np.ndarray]: The filtered blocks, one for every input block.
+        """
+
+        StreamingEnhansement.get_method(method)
+        blocks = iter(blocks)
+        buffered, frames, peaks, estimates = [], 0, None, None
+        for block in blocks:
+            block = np.asarray(block, dtype=np.float64)
+            channels = block[np.newaxis] if block.ndim == 1 else np.transpose(block)
+            if estimates is None:
+                peaks = np.zeros(len(channels))
+                estimates = [WelchAccumulator(samplerate, tolerance=psd_tolerance) if method == "wiener"
+                             else AutocorrelationAccumulator(1024) for _ in channels]
+            for i, channel in enumerate(channels):
+                peaks[i] = max(peaks[i], np.max(np.abs(channel), initial=0))
+                estimates[i].update(channel)
+            buffered.append(block)
+            frames += len(block)
+
+            converged = method == "wiener" and all(estimate.converged for estimate in estimates)
+            if frames >= warmup or converged:
+                break
+
+        if estimates is None:
+            return
+        if stats is not None:
+            stats["warmup_frames"] = frames
+        filters, scales = StreamingEnhansement.__design(method, estimates, peaks, buffered)
+        for block in buffered:
+            yield StreamingEnhansement.__process(block, filters, scales)
+        for block in blocks:
+            yield StreamingEnhansement.__process(np.asarray(block, dtype=np.float64), filters, scales)
+        return
+
+    @staticmethod
+    def __design(method: str, estimates: list, peaks: np.ndarray, buffered: list) \
+        -> Tuple[list, np.ndarray]:
+        """
+        Creates the filters of the single pass and the scales of the channels.
+        """
+
+        if method == "lib_wiener":
+            scales = np.ones(len(estimates))
+            taps = [StreamingEnhansement.__lib_wiener_taps(estimate.acf) for estimate in estimates]
+        else:
+            scales = np.where(peaks > 0, peaks, 1.0)
+            taps = []
+            for i, (estimate, scale) in enumerate(zip(estimates, scales)):
+                if estimate.segments == 0:
+                    # Shorter than a Welch segment, the PSD is taken from all buffered samples
+                    channel = np.concatenate([block if block.ndim == 1 else block[:, i] for block in buffered])
+                    freqs, psd, _ = SoundEnhansement.welch_psd(estimate.samplerate, channel / scale)
+                else:
+                    freqs, psd = estimate.freqs, estimate.psd / scale ** 2
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    taps.append(SoundEnhansement.wiener_taps(freqs, psd))
+
+        filters = [StreamingFilter(channel_taps if np.all(np.isfinite(channel_taps)) else np.ones(1))
+                   for channel_taps in taps]
+        return filters, scales
+
+    @staticmethod
+    def __lib_wiener_taps(acf: np.ndarray) \
+        -> np.ndarray:
+        """
+        Designs the SciPy Lib Wiener filter from the autocorrelation at non-negative lags.
+        """
+
+        R = np.concatenate([acf[:0:-1], acf])
+        return SoundEnhansement.lib_wiener_taps(R, acf)
+
+    @staticmethod
+    def __channels(blocks: Iterable[np.ndarray]) \
+        -> Iterator[np.ndarray]:
+        """
+        Converts the blocks to float64 arrays of shape (channels, frames).
+        """
+
+        for block in blocks:
+            block = np.asarray(block, dtype=np.float64)
+            yield block[np.newaxis] if block.ndim == 1 else np.transpose(block)
+
+    @staticmethod
+    def __filter(blocks: Callable[[], Iterable[np.ndarray]], filters: list, scales: np.ndarray) \
+        -> Iterator[np.ndarray]:
+        """
+        Runs the second pass, filtering the scaled blocks channel by channel.
+        """
+
+        for block in blocks():
+            yield StreamingEnhansement.__process(np.asarray(block, dtype=np.float64), filters, scales)
+
+    @staticmethod
+    def __process(block: np.ndarray, filters: list, scales: np.ndarray) \
+        -> np.ndarray:
+        """
+        Filters the scaled block channel by channel.
+        """
+
+        channels = block[np.newaxis] if block.ndim == 1 else np.transpose(block)
+        filtered = np.array([f.process(channel / scale) for f, channel, scale in zip(filters, channels, scales)])
+        return filtered[0] if block.ndim == 1 else np.transpose(filtered)
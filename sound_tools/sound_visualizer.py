@@ -3,6 +3,8 @@ import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib.widgets import CheckButtons
 
+from typing import Tuple
+
 
 class SoundWaveform:
     @staticmethod
@@ -92,4 +94,109 @@ class SoundWaveform:
 
         plt.show()
         return
-    
\ No newline at end of file
+
+
+class LiveSpectrum:
+    """
+    Incremental spectrum and level meter for the audio that is being played.
+
+    The played samples are pushed into a ring buffer as the playback goes on, and every
+    display frame takes a single short FFT of the newest samples, so the cost per frame
+    does not depend on the file length.
+    """
+
+    def __init__(self, samplerate: int, nfft: int = 2048, bands: int = 64, history: int = 400,
+                 floor_db: float = -90.0) \
+        -> None:
+        """
+        Initializes the meter.
+
+        Args:
+            samplerate (int): The samplerate of the audio.
+            nfft (int): The FFT length, and the ring buffer size.
+            bands (int): The number of logarithmic frequency bands, the scrolling spectrum height.
+            history (int): The number of frames in the scrolling spectrum, its width.
+            floor_db (float): The lowest level shown, in dB relative to full scale.
+
+        Returns:
+            None
+        """
+
+        self.samplerate = samplerate
+        self.nfft = nfft
+        self.floor_db = floor_db
+        self.ring = np.zeros(nfft)
+        self.position = 0
+        self.window = np.hanning(nfft)
+        self.scale = 2 / np.sum(self.window) ** 2
+
+        # The first bin of every band, the bands are logarithmic from 40 Hz to Nyquist
+        freqs = np.fft.rfftfreq(nfft, 1 / samplerate)
+        edges = np.geomspace(40, samplerate / 2, bands + 1)[:-1]
+        self.band_starts = np.maximum.accumulate(np.searchsorted(freqs, edges))
+        self.band_sizes = np.diff(np.append(self.band_starts, len(freqs)))
+
+        self.colors = (plt.get_cmap("inferno")(np.linspace(0, 1, 256))[:, :3] * 255).astype(np.uint8)
+        self.image = np.zeros((bands, history, 3), dtype=np.uint8)
+        return
+
+    def reset(self) \
+        -> None:
+        """
+        Clears the ring buffer and the scrolling spectrum.
+        """
+
+        self.ring[:] = 0
+        self.position = 0
+        self.image[:] = 0
+        return
+
+    def push(self, samples: np.ndarray) \
+        -> None:
+        """
+        Writes the newly played samples into the ring buffer.
+
+        Args:
+            samples (np.ndarray): The mono samples in the [-1, 1] range.
+
+        Returns:
+            None
+        """
+
+        samples = samples[-self.nfft:]
+        indices = (self.position + np.arange(len(samples))) % self.nfft
+        self.ring[indices] = samples
+        self.position = (self.position + len(samples)) % self.nfft
+        return
+
+    def frame(self) \
+        -> Tuple[np.ndarray, float, float]:
+        """
+        Computes the spectrum of the newest samples and scrolls it into the image.
+
+        Returns:
+            Tuple[np.ndarray, float, float]: The band levels, the RMS level and the peak level, in dB.
+        """
+
+        samples = np.roll(self.ring, -self.position)
+        power = np.abs(np.fft.rfft(samples * self.window)) ** 2 * self.scale
+        bands = np.add.reduceat(power, self.band_starts) / np.maximum(self.band_sizes, 1)
+        bands_db = np.maximum(10 * np.log10(bands + 1e-20), self.floor_db)
+
+        rms_db = max(10 * np.log10(np.mean(samples ** 2) + 1e-20), self.floor_db)
+        peak_db = max(20 * np.log10(np.max(np.abs(samples)) + 1e-10), self.floor_db)
+
+        # Scroll the image by one column, the low frequencies are at the bottom
+        levels = np.clip((1 - bands_db / self.floor_db) * 255, 0, 255).astype(np.uint8)
+        self.image[:, :-1] = self.image[:, 1:]
+        self.image[:, -1] = self.colors[levels[::-1]]
+        return bands_db, rms_db, peak_db
+
+    def ppm(self) \
+        -> bytes:
+        """
+        Returns the scrolling spectrum as PPM data for tk.PhotoImage.
+        """
+
+        height, width, _ = self.image.shape
+        return f"P6 {width} {height} 255\n".encode() + self.image.tobytes()